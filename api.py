@@ -1,24 +1,53 @@
+import asyncio
 import logging
 import os
+import secrets
+import threading
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
-from query_data_enhanced import query_rag_structured
+from precomputed_answers import PrecomputedAnswers, log_question
+from profiling import sample_profile
+from query_data_enhanced import query_rag_structured, schedule_warm_up, warm_up
+from vector_store import UnknownSourceError, game_name, indexed_sources, source_slug
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def warm_up_rag():
+    try:
+        warm_up()
+        logger.info("RAG dependencies loaded")
+    except Exception as e:
+        logger.warning(f"Could not preload RAG dependencies: {e}")
+    # Load the precomputed answers, or start regenerating stale ones.
+    precomputed_answers.check_index()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the RAG dependencies in the background so the server starts
+    # accepting requests (and passing health checks) straight away. Queries
+    # that arrive meanwhile wait for it.
+    schedule_warm_up()
+    threading.Thread(target=warm_up_rag, name="rag-warm-up", daemon=True).start()
+    yield
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Board Games RAG API",
     description="API for querying board game rules using RAG (Retrieval-Augmented Generation)",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -30,6 +59,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.environ.get("RAG_ADMIN_TOKEN")
+MAX_PROFILE_SECONDS = 60
+
+# Answers to frequent questions, computed ahead of time
+precomputed_answers = PrecomputedAnswers()
+
 # Request tracking
 request_count = 0
 start_time = datetime.now()
@@ -38,6 +74,8 @@ start_time = datetime.now()
 # Pydantic models for request/response
 class QueryRequest(BaseModel):
     question: str
+    sources: Optional[List[str]] = None  # e.g. ["data/monopoly.pdf"]
+    games: Optional[List[str]] = None  # e.g. ["Monopoly", "ticket_to_ride"]
 
 
 class Source(BaseModel):
@@ -46,10 +84,19 @@ class Source(BaseModel):
     score: float
 
 
+class Retrieval(BaseModel):
+    candidates: int  # chunks returned by the vector search
+    depth: int  # chunks passed to the LLM
+    best_distance: Optional[float]
+    early_exit: bool  # answered without the LLM, as nothing was relevant
+
+
 class QueryResponse(BaseModel):
     answer: str
     sources: List[Source]
     question: str
+    precomputed: bool = False
+    retrieval: Optional[Retrieval] = None
 
 
 class HealthResponse(BaseModel):
@@ -67,6 +114,7 @@ async def root():
         "endpoints": {
             "POST /query": "Ask a question about board games",
             "GET /health": "Check API and database health",
+            "GET /games": "List the board games in the index",
             "GET /docs": "API documentation",
         },
     }
@@ -103,48 +151,55 @@ async def query_board_games(request: QueryRequest):
         )
 
     try:
+        # Answers are only precomputed for questions without filters
+        precomputed = None
+        if not request.sources and not request.games:
+            log_question(request.question)
+            precomputed = precomputed_answers.lookup(request.question)
+
         # Get structured response from the RAG system
-        result = query_rag_structured(request.question)
+        if precomputed is not None:
+            result = precomputed
+        else:
+            result = query_rag_structured(
+                request.question, sources=request.sources, games=request.games
+            )
         answer = result["answer"]
         sources = [
             Source(id=source["id"], content=source["content"], score=source["score"])
             for source in result["sources"]
         ]
 
-        return QueryResponse(answer=answer, sources=sources, question=request.question)
+        return QueryResponse(
+            answer=answer,
+            sources=sources,
+            question=request.question,
+            precomputed=precomputed is not None,
+            retrieval=result.get("retrieval"),
+        )
 
+    except UnknownSourceError as e:
+        # Unknown source or game in the filters
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
 
 @app.get("/games")
 async def get_supported_games():
-    """Get list of supported board games"""
+    """Get list of the board games in the index"""
+    if not os.path.exists("chroma"):
+        return {"games": []}
+
     return {
         "games": [
             {
-                "name": "Monopoly",
-                "description": "Classic property trading board game",
-                "keywords": [
-                    "monopoly",
-                    "property",
-                    "boardwalk",
-                    "jail",
-                    "chance",
-                    "community chest",
-                ],
-            },
-            {
-                "name": "Ticket to Ride",
-                "description": "Train route building game",
-                "keywords": [
-                    "ticket to ride",
-                    "train",
-                    "route",
-                    "destination",
-                    "railroad",
-                ],
-            },
+                "name": game_name(source),
+                "id": source_slug(source),
+                "source": source,
+                "chunks": info["chunks"],
+            }
+            for source, info in sorted(indexed_sources().items())
         ]
     }
 
@@ -176,5 +231,30 @@ async def get_recent_logs():
         return {"error": f"Could not retrieve logs: {str(e)}"}
 
 
+@app.get("/admin/profile")
+async def profile_server(
+    seconds: float = 10,
+    interval_ms: float = 5,
+    x_admin_token: Optional[str] = Header(default=None),
+):
+    """Capture a sampling profile of the running server for a few seconds"""
+    if ADMIN_TOKEN is None:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled")
+    token = (x_admin_token or "").encode("utf-8")
+    if not secrets.compare_digest(token, ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"seconds must be between 0 and {MAX_PROFILE_SECONDS}",
+        )
+    if interval_ms <= 0:
+        raise HTTPException(status_code=400, detail="interval_ms must be positive")
+
+    # Sample from a worker thread so requests keep being served meanwhile.
+    logger.info(f"Capturing a {seconds}s sampling profile")
+    return await asyncio.to_thread(sample_profile, seconds, interval_ms / 1000)
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,124 @@
+"""
+Startup-time benchmark for the CLI entry points and the API.
+
+Each module is imported in a fresh interpreter with `python -X importtime`,
+and the cumulative time of its imports is compared against STARTUP_BUDGETS_MS.
+The script exits with status 1 when a module goes over its budget, so it can
+run in CI to keep heavy imports out of the startup path.
+
+Usage:
+    uv run python benchmark_startup.py
+    uv run python benchmark_startup.py --repeat 5 --top 10 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Budgets for importing each module, in milliseconds. The CLIs should only pay
+# for argparse and the standard library until they actually do work; the API
+# has to import FastAPI and uvicorn to serve requests.
+STARTUP_BUDGETS_MS = {
+    "query_data": 50,
+    "query_data_enhanced": 50,
+    "populate_database": 50,
+    "get_embedding_function": 20,
+    "api": 800,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "modules",
+        nargs="*",
+        default=list(STARTUP_BUDGETS_MS),
+        help="Modules to benchmark (default: all budgeted modules).",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per module; the fastest is kept."
+    )
+    parser.add_argument(
+        "--top", type=int, default=5, help="Number of slowest imports to list."
+    )
+    parser.add_argument("--json", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    results = []
+    for module in args.modules:
+        result = benchmark_module(module, args.repeat)
+        budget = STARTUP_BUDGETS_MS.get(module)
+        result["budget_ms"] = budget
+        result["over_budget"] = budget is not None and result["total_ms"] > budget
+        results.append(result)
+        print_result(result, args.top)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if any(result["over_budget"] for result in results):
+        sys.exit(1)
+
+
+def benchmark_module(module: str, repeat: int) -> dict:
+    """Import module in fresh interpreters and keep the fastest run."""
+    best = None
+    for _ in range(repeat):
+        total_ms, imports = measure_imports(module)
+        if best is None or total_ms < best["total_ms"]:
+            best = {"module": module, "total_ms": total_ms, "imports": imports}
+    return best
+
+
+def measure_imports(module: str):
+    """
+    Return the cumulative import time of module in ms, and the time of each
+    import made directly by it.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr}")
+
+    # Lines look like "import time:   self [us] |  cumulative | imported package",
+    # with nested imports indented two spaces per level. A package's line comes
+    # after the lines of everything it imported.
+    total_ms = 0.0
+    imports = {}
+    children = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        ms = int(cumulative_us) / 1000
+        if depth == 1:
+            children[name.strip()] = ms
+        elif depth == 0:
+            if name.strip() == module:
+                total_ms = ms
+                imports = children
+            children = {}
+    return total_ms, imports
+
+
+def print_result(result: dict, top: int):
+    budget = result["budget_ms"]
+    budget_text = f" (budget {budget} ms)" if budget is not None else ""
+    status = "❌" if result["over_budget"] else "✅"
+    print(f"{status} {result['module']}: {result['total_ms']:.1f} ms{budget_text}")
+
+    slowest = sorted(result["imports"].items(), key=lambda item: -item[1])[:top]
+    for name, ms in slowest:
+        print(f"     {ms:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Chunking strategies used by populate_database.py.
+
+Each preset in CHUNKING_PRESETS describes how the PDF pages are split before
+they are embedded. Chunk sizes are measured either in characters (the original
+behaviour) or in tokens of the embedding model, and the "sections" preset
+splits rulebooks at their headings, joining text that continues across page
+breaks.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from itertools import groupby
+from typing import TYPE_CHECKING, Callable, Dict, List
+
+from get_embedding_function import EMBEDDING_TOKENIZER
+
+# populate_database.py reads CHUNKING_PRESETS to build its CLI, so LangChain is
+# only imported once documents are actually split.
+if TYPE_CHECKING:
+    from langchain.schema.document import Document
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+DEFAULT_CHUNKING_PRESET = "recursive"
+
+CHUNKING_PRESETS = {
+    "recursive": {
+        "description": "Recursive splitter sized in characters (original behaviour)",
+        "strategy": "recursive",
+        "length": "characters",
+        "chunk_size": 1200,
+        "chunk_overlap": 200,
+    },
+    "tokens-256": {
+        "description": "Recursive splitter sized in embedding-model tokens",
+        "strategy": "recursive",
+        "length": "tokens",
+        "chunk_size": 256,
+        "chunk_overlap": 32,
+    },
+    "tokens-512": {
+        "description": "Recursive splitter sized in embedding-model tokens",
+        "strategy": "recursive",
+        "length": "tokens",
+        "chunk_size": 512,
+        "chunk_overlap": 64,
+    },
+    "sections": {
+        "description": "Heading-aware splitter that joins sections across page breaks",
+        "strategy": "sections",
+        "length": "tokens",
+        "chunk_size": 512,
+        "chunk_overlap": 64,
+    },
+}
+
+# Numbered rulebook headings such as "3. Building Routes" or "2.1 Setup".
+NUMBERED_HEADING = re.compile(r"^\d+(\.\d+)*\.?\s+[A-Z]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token)."""
+    return max(1, len(text) // 4) if text else 0
+
+
+@lru_cache(maxsize=None)
+def get_token_counter() -> Callable[[str], int]:
+    """
+    Return a function that counts tokens with the embedding model's tokenizer.
+
+    Falls back to estimate_tokens when the tokenizer can't be loaded
+    (transformers not installed or the tokenizer can't be downloaded).
+    """
+    try:
+        from transformers import AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_TOKENIZER)
+    except Exception as e:
+        print(
+            f"⚠️  Tokenizer {EMBEDDING_TOKENIZER} unavailable ({e}), estimating tokens"
+        )
+        return estimate_tokens
+
+    # We only count tokens here, so silence the "sequence too long" warning.
+    tokenizer.model_max_length = 10**9
+
+    def count_tokens(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+    return count_tokens
+
+
+def get_length_function(preset: Dict) -> Callable[[str], int]:
+    if preset["length"] == "tokens":
+        return get_token_counter()
+    return len
+
+
+def split_documents(
+    documents: List[Document], preset_name: str = DEFAULT_CHUNKING_PRESET
+) -> List[Document]:
+    """Split documents into chunks using one of the CHUNKING_PRESETS."""
+    if preset_name not in CHUNKING_PRESETS:
+        raise ValueError(
+            f"Unknown chunking preset '{preset_name}'. "
+            f"Choose one of: {', '.join(CHUNKING_PRESETS)}"
+        )
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    preset = CHUNKING_PRESETS[preset_name]
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=preset["chunk_size"],
+        chunk_overlap=preset["chunk_overlap"],
+        length_function=get_length_function(preset),
+        is_separator_regex=False,
+    )
+
+    if preset["strategy"] == "sections":
+        return split_by_sections(
+            documents, text_splitter, preset["chunk_size"], get_length_function(preset)
+        )
+    return text_splitter.split_documents(documents)
+
+
+def is_heading(line: str) -> bool:
+    """Guess whether a line of PDF text is a section heading."""
+    text = line.strip()
+    if not 2 <= len(text) <= 60 or text.endswith((".", ",", ";")):
+        return False
+    if sum(c.isalpha() for c in text) < 2:
+        return False
+    if text.isupper():
+        return True
+    return bool(NUMBERED_HEADING.match(text)) and len(text.split()) <= 8
+
+
+def split_by_sections(
+    documents: List[Document],
+    text_splitter: RecursiveCharacterTextSplitter,
+    chunk_size: int,
+    length_function: Callable[[str], int],
+) -> List[Document]:
+    """
+    Split each source at its headings, ignoring page boundaries.
+
+    Small consecutive sections are packed together up to chunk_size, and
+    sections that are too large are split further with text_splitter. Every
+    chunk keeps the metadata of the page it starts on (so chunk IDs keep the
+    "source:page:index" form) and records the page it ends on as "end_page".
+    """
+    ordered = sorted(
+        documents,
+        key=lambda doc: (doc.metadata.get("source", ""), doc.metadata.get("page", 0)),
+    )
+
+    chunks = []
+    for _source, source_pages in groupby(
+        ordered, key=lambda doc: doc.metadata.get("source", "")
+    ):
+        source_pages = list(source_pages)
+        page_metadata = {
+            doc.metadata.get("page", 0): doc.metadata for doc in source_pages
+        }
+        sections = collect_sections(source_pages)
+
+        # Pack whole sections into chunks, flushing when the next one won't fit.
+        pending = []
+        pending_size = 0
+        for section in sections:
+            section_size = length_function(section_text(section))
+            if pending and pending_size + section_size > chunk_size:
+                chunks.append(make_chunk(pending, page_metadata))
+                pending, pending_size = [], 0
+
+            if section_size > chunk_size:
+                chunks.extend(split_section(section, text_splitter, page_metadata))
+            else:
+                pending.extend(section)
+                pending_size += section_size
+
+        if pending:
+            chunks.append(make_chunk(pending, page_metadata))
+
+    return chunks
+
+
+def collect_sections(pages: List[Document]) -> List[List[tuple]]:
+    """Group the (line, page) pairs of a source into heading-delimited sections."""
+    sections = []
+    current = []
+    for doc in pages:
+        page = doc.metadata.get("page", 0)
+        for line in doc.page_content.splitlines():
+            if not line.strip():
+                continue
+            if is_heading(line) and current:
+                sections.append(current)
+                current = []
+            current.append((line, page))
+    if current:
+        sections.append(current)
+    return sections
+
+
+def section_text(lines: List[tuple]) -> str:
+    return "\n".join(line for line, _page in lines)
+
+
+def make_chunk(lines: List[tuple], page_metadata: Dict) -> Document:
+    from langchain.schema.document import Document
+
+    start_page = lines[0][1]
+    end_page = lines[-1][1]
+    metadata = {**page_metadata[start_page], "page": start_page, "end_page": end_page}
+    return Document(page_content=section_text(lines), metadata=metadata)
+
+
+def split_section(
+    lines: List[tuple],
+    text_splitter: RecursiveCharacterTextSplitter,
+    page_metadata: Dict,
+) -> List[Document]:
+    """Split an oversized section, mapping each piece back to its pages."""
+    from langchain.schema.document import Document
+
+    text = section_text(lines)
+
+    # Character offset at which each line starts, to map pieces back to pages.
+    line_offsets = []
+    offset = 0
+    for line, page in lines:
+        line_offsets.append((offset, page))
+        offset += len(line) + 1
+
+    def page_at(position: int):
+        page = lines[0][1]
+        for line_start, line_page in line_offsets:
+            if line_start > position:
+                break
+            page = line_page
+        return page
+
+    chunks = []
+    search_from = 0
+    for piece in text_splitter.split_text(text):
+        start = text.find(piece, search_from)
+        if start == -1:
+            start = search_from
+        else:
+            search_from = start + 1
+        start_page = page_at(start)
+        metadata = {
+            **page_metadata[start_page],
+            "page": start_page,
+            "end_page": page_at(start + len(piece) - 1),
+        }
+        chunks.append(Document(page_content=piece, metadata=metadata))
+    return chunks
+
+
+def chunk_stats(chunks: List[Document]) -> Dict:
+    """
+    Chunk count and token statistics, measured with the embedding tokenizer.
+
+    "estimated" is True when the tokenizer isn't available and the counts are
+    estimate_tokens() approximations.
+    """
+    count_tokens = get_token_counter()
+    token_counts = [count_tokens(chunk.page_content) for chunk in chunks]
+    total_tokens = sum(token_counts)
+    return {
+        "chunks": len(chunks),
+        "total_tokens": total_tokens,
+        "avg_tokens": total_tokens / len(chunks) if chunks else 0.0,
+        "max_tokens": max(token_counts, default=0),
+        "estimated": count_tokens is estimate_tokens,
+    }
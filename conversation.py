@@ -0,0 +1,229 @@
+"""
+Conversation-aware querying for the chat interfaces.
+
+A ConversationSession keeps the state needed to answer follow-up questions
+("and what about doubles?") without sending the whole chat history to the
+LLM:
+
+- follow-ups are rewritten into standalone questions before retrieval
+- the last few exchanges are kept verbatim, and older ones are folded one at
+  a time into a short rolling summary, so prompt size stays bounded; the
+  fold runs in the background after an answer is returned, and the next
+  question waits for it
+- when the rewritten question is about the same topic as the previous one
+  (its embedding is close to the one used for the last retrieval), the
+  previous chunks are reused instead of searching again
+"""
+
+import math
+import threading
+from typing import Any, Dict, List, Optional
+
+from query_data_enhanced import (
+    NOT_ENOUGH_INFORMATION,
+    format_context,
+    format_sources,
+    get_model,
+    retrieve,
+)
+from vector_store import embed_query
+
+REWRITE_PROMPT_TEMPLATE = """
+Rewrite the follow-up question so that it can be understood without the conversation. Keep the board game and any rules it refers to. If it is already a standalone question, return it unchanged. Reply with the question only.
+
+Conversation summary:
+{summary}
+
+Recent conversation:
+{history}
+
+Follow-up question: {question}
+
+Standalone question:
+"""
+
+SUMMARY_PROMPT_TEMPLATE = """
+Update the summary of a conversation about board game rules with the new exchange. Keep the games, rules and facts that later questions may refer to. Reply with the updated summary only, in at most {max_words} words.
+
+Current summary:
+{summary}
+
+New exchange:
+{history}
+
+Updated summary:
+"""
+
+CONVERSATION_PROMPT_TEMPLATE = """
+Answer the question based ONLY on the following context. If the context doesn't contain enough information to answer the question, say so clearly.
+
+Context:
+{context}
+
+---
+
+Conversation so far (for reference only):
+{summary}
+
+Question: {question}
+
+Instructions:
+- Answer based ONLY on the provided context
+- If the context doesn't contain the answer, say "The provided context doesn't contain enough information to answer this question"
+- Do not use any external knowledge
+- Be specific and accurate
+"""
+
+# Exchanges kept verbatim before being folded into the summary.
+RECENT_TURNS = 2
+# Answers are truncated to this many characters in the rewrite prompt.
+MAX_ANSWER_CHARS = 500
+SUMMARY_MAX_WORDS = 120
+# Cosine similarity above which a question is treated as the same topic.
+SAME_TOPIC_SIMILARITY = 0.85
+
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class ConversationSession:
+    """Answers a sequence of questions that may refer to earlier ones."""
+
+    def __init__(
+        self,
+        sources: Optional[List[str]] = None,
+        games: Optional[List[str]] = None,
+        recent_turns: int = RECENT_TURNS,
+        same_topic_similarity: float = SAME_TOPIC_SIMILARITY,
+    ):
+        self.sources = sources
+        self.games = games
+        self.recent_turns = recent_turns
+        self.same_topic_similarity = same_topic_similarity
+        self.summary = ""
+        self.recent = []  # [(question, answer), ...], oldest first
+        self.last_embedding = None
+        self.last_results = None
+        self.last_retrieval = None
+        self.summary_thread = None
+
+    def ask(self, question: str) -> Dict[str, Any]:
+        """
+        Answer a question in the context of the conversation.
+
+        Returns the same structure as query_rag_structured, plus:
+        - standalone_question: str - The question used for retrieval
+        - reused_context: bool - Whether the previous chunks were reused
+        """
+        from langchain.prompts import ChatPromptTemplate
+
+        # The rewrite needs the summary of the previous exchanges.
+        self.wait_for_summary()
+        standalone_question = self.rewrite_question(question)
+
+        # Only search again when the topic has moved on.
+        embedding = embed_query(standalone_question)
+        reused_context = (
+            self.last_results is not None
+            and cosine_similarity(embedding, self.last_embedding)
+            >= self.same_topic_similarity
+        )
+        if reused_context:
+            results, retrieval = self.last_results, self.last_retrieval
+        else:
+            results, retrieval = retrieve(
+                standalone_question,
+                sources=self.sources,
+                games=self.games,
+                embedding=embedding,
+            )
+            self.last_embedding = embedding
+            self.last_results = results
+            self.last_retrieval = retrieval
+
+        # Skip the LLM when nothing relevant was found.
+        if not retrieval["early_exit"]:
+            prompt_template = ChatPromptTemplate.from_template(
+                CONVERSATION_PROMPT_TEMPLATE
+            )
+            prompt = prompt_template.format(
+                context=format_context(results),
+                summary=self.summary or "(none)",
+                question=standalone_question,
+            )
+            answer = get_model().invoke(prompt)
+        else:
+            answer = NOT_ENOUGH_INFORMATION
+
+        self.remember(question, answer)
+        return {
+            "answer": answer,
+            "sources": format_sources(results),
+            "retrieval": retrieval,
+            "standalone_question": standalone_question,
+            "reused_context": reused_context,
+        }
+
+    def rewrite_question(self, question: str) -> str:
+        """Turn a follow-up question into one that stands on its own."""
+        if not self.recent and not self.summary:
+            return question
+
+        from langchain.prompts import ChatPromptTemplate
+
+        prompt_template = ChatPromptTemplate.from_template(REWRITE_PROMPT_TEMPLATE)
+        prompt = prompt_template.format(
+            summary=self.summary or "(none)",
+            history=format_exchanges(self.recent),
+            question=question,
+        )
+        rewritten = get_model().invoke(prompt).strip().strip('"')
+        return rewritten or question
+
+    def remember(self, question: str, answer: str):
+        """Record an exchange, folding the oldest ones into the summary."""
+        self.recent.append((question, answer))
+        oldest = []
+        while len(self.recent) > self.recent_turns:
+            oldest.append(self.recent.pop(0))
+
+        # Only the next question needs the summary, so the answer isn't held
+        # back by another LLM call.
+        if oldest:
+            self.summary_thread = threading.Thread(
+                target=self.fold_into_summary,
+                args=(oldest,),
+                name="conversation-summary",
+                daemon=True,
+            )
+            self.summary_thread.start()
+
+    def fold_into_summary(self, exchanges: List[tuple]):
+        from langchain.prompts import ChatPromptTemplate
+
+        for exchange in exchanges:
+            prompt_template = ChatPromptTemplate.from_template(SUMMARY_PROMPT_TEMPLATE)
+            prompt = prompt_template.format(
+                summary=self.summary or "(none)",
+                history=format_exchanges([exchange]),
+                max_words=SUMMARY_MAX_WORDS,
+            )
+            self.summary = get_model().invoke(prompt).strip()
+
+    def wait_for_summary(self):
+        """Wait until the previous exchanges have been folded into the summary."""
+        if self.summary_thread is not None:
+            self.summary_thread.join()
+            self.summary_thread = None
+
+
+def format_exchanges(exchanges: List[tuple]) -> str:
+    lines = []
+    for question, answer in exchanges:
+        if len(answer) > MAX_ANSWER_CHARS:
+            answer = answer[:MAX_ANSWER_CHARS] + "..."
+        lines.append(f"User: {question}\nAssistant: {answer}")
+    return "\n".join(lines)
@@ -0,0 +1,97 @@
+"""
+Content-addressed cache of chunk embeddings.
+
+Embeddings are stored in a single SQLite file keyed by a hash of the
+embedding model name and the chunk text, so chunks whose text hasn't changed
+are never sent to the embedding model twice. The cache lives outside the
+Chroma directory, which means it survives `populate_database.py --reset` and
+is shared by every index built with the same model.
+"""
+
+import hashlib
+import sqlite3
+from array import array
+from typing import Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_CACHE_PATH = "embedding_cache.sqlite3"
+
+# SQLite limits the number of "?" parameters in one statement.
+LOOKUP_BATCH_SIZE = 500
+
+
+def cache_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """Wrap an embedding function, reusing stored vectors for known texts."""
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        path: str = EMBEDDING_CACHE_PATH,
+    ):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [cache_key(self.model_name, text) for text in texts]
+        cached = self._lookup(set(keys))
+
+        # Embed each missing text once, even if it appears several times.
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_entries = dict(zip(missing.keys(), vectors))
+            self._store(new_entries)
+            cached.update(new_entries)
+
+        return [list(cached[key]) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        # Queries are rarely repeated verbatim, so they bypass the cache.
+        return self.embeddings.embed_query(text)
+
+    def _lookup(self, keys: set) -> Dict[str, List[float]]:
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+            batch = keys[start : start + LOOKUP_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.connection.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                batch,
+            )
+            for key, blob in rows:
+                found[key] = array("f", blob).tolist()
+        return found
+
+    def _store(self, entries: Dict[str, List[float]]):
+        # float32 halves the file size and is plenty for similarity search.
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [
+                    (key, array("f", vector).tobytes())
+                    for key, vector in entries.items()
+                ],
+            )
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,55 @@
+"""
+Fake embedding and LLM backends for load tests and local development.
+
+Select them with EMBEDDING_BACKEND=fake and LLM_BACKEND=fake. They answer
+without Ollama after a simulated latency (FAKE_EMBEDDING_LATENCY and
+FAKE_LLM_LATENCY, in seconds), so the API can be load-tested on any machine
+and the cost of the RAG pipeline itself can be measured in isolation.
+"""
+
+import os
+import time
+from typing import List
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+# Same size as nomic-embed-text, so an index built with Ollama can be searched.
+FAKE_EMBEDDING_SIZE = 768
+
+FAKE_ANSWER = "This is a fake answer generated for load testing."
+
+
+class FakeEmbeddings(DeterministicFakeEmbedding):
+    """Deterministic embeddings with a simulated per-call latency."""
+
+    latency: float = 0.0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency)
+        return super().embed_query(text)
+
+
+class FakeLLM:
+    """Stands in for OllamaLLM, returning a canned answer after a delay."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def invoke(self, prompt: str) -> str:
+        time.sleep(self.latency)
+        return FAKE_ANSWER
+
+
+def get_fake_embeddings() -> FakeEmbeddings:
+    return FakeEmbeddings(
+        size=FAKE_EMBEDDING_SIZE,
+        latency=float(os.environ.get("FAKE_EMBEDDING_LATENCY", "0")),
+    )
+
+
+def get_fake_llm() -> FakeLLM:
+    return FakeLLM(latency=float(os.environ.get("FAKE_LLM_LATENCY", "0")))
@@ -1,10 +1,40 @@
-from langchain_community.embeddings.bedrock import BedrockEmbeddings
-from langchain_ollama import OllamaEmbeddings
+import os
+
+# Select the embedding backend with EMBEDDING_BACKEND ("ollama", "bedrock" or
+# "fake", see fake_backends.py).
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "ollama")
+
+EMBEDDING_MODELS = {
+    "ollama": "nomic-embed-text",
+    "bedrock": "amazon.titan-embed-text-v1",
+    "fake": "fake-embedding",
+}
+EMBEDDING_MODEL = EMBEDDING_MODELS.get(EMBEDDING_BACKEND, EMBEDDING_BACKEND)
+
+# Hugging Face tokenizer matching the Ollama model, used to size chunks in tokens.
+EMBEDDING_TOKENIZER = "nomic-ai/nomic-embed-text-v1"
 
 
 def get_embedding_function():
-    # embeddings = BedrockEmbeddings(
-    #     credentials_profile_name="default", region_name="us-east-1"
-    # )
-    embeddings = OllamaEmbeddings(model="nomic-embed-text")
-    return embeddings
+    # Backends are imported only when selected, which keeps CLI startup fast
+    # (the Bedrock integration pulls in boto3).
+    if EMBEDDING_BACKEND == "bedrock":
+        from langchain_community.embeddings.bedrock import BedrockEmbeddings
+
+        return BedrockEmbeddings(
+            credentials_profile_name="default",
+            region_name="us-east-1",
+            model_id=EMBEDDING_MODEL,
+        )
+    if EMBEDDING_BACKEND == "ollama":
+        from langchain_ollama import OllamaEmbeddings
+
+        return OllamaEmbeddings(model=EMBEDDING_MODEL)
+    if EMBEDDING_BACKEND == "fake":
+        from fake_backends import get_fake_embeddings
+
+        return get_fake_embeddings()
+    raise ValueError(
+        f"Unknown EMBEDDING_BACKEND '{EMBEDDING_BACKEND}'. "
+        f"Choose one of: {', '.join(EMBEDDING_MODELS)}"
+    )
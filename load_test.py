@@ -0,0 +1,440 @@
+"""
+Load generator and capacity report for the Board Games RAG API.
+
+Replays a corpus of questions against the API with open-loop (Poisson)
+arrivals: requests are sent at the offered rate whether or not earlier ones
+have finished, and latency is measured from the moment a request was due, so
+queueing in front of a saturated server shows up in the numbers. Each arrival
+rate in --rates is run for --duration seconds, and the report lists the
+throughput/latency curve, error and timeout rates, client-side queue depth
+over time and the highest rate the server sustained.
+
+Usage:
+    # Against a running API (real Ollama backends)
+    uv run python load_test.py --url http://localhost:8000 --rates 0.5,1,2
+
+    # Start the API with fake embedding/LLM backends and a simulated LLM latency
+    uv run python load_test.py --spawn-server --fake-backends --fake-llm-latency 0.5
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+DEFAULT_QUESTIONS = [
+    "How do you win in Monopoly?",
+    "What happens when you land on Free Parking?",
+    "How do you collect rent in Monopoly?",
+    "How much total money does a player start with in Monopoly?",
+    "How do you get out of jail in Monopoly?",
+    "What are the basic rules of Ticket to Ride?",
+    "How do you score points in Ticket to Ride?",
+    "How many points does the longest continuous train get in Ticket to Ride?",
+    "How does a pawn move in chess?",
+    "What is castling in chess?",
+]
+
+# A step is saturated when it misses any of these.
+MIN_THROUGHPUT_RATIO = 0.9  # achieved / offered requests per second
+MAX_FAILURE_RATE = 0.01  # errors + timeouts
+QUEUE_SAMPLE_INTERVAL = 0.25  # seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure how much load one API instance can take."
+    )
+    parser.add_argument("--url", default="http://localhost:8000", help="API base URL.")
+    parser.add_argument(
+        "--endpoint", default="/query", help="Endpoint to POST questions to."
+    )
+    parser.add_argument(
+        "--questions", help="File with one question per line (default: built-in set)."
+    )
+    parser.add_argument(
+        "--rates",
+        default="0.5,1,2,4,8",
+        help="Comma-separated arrival rates to step through, in requests/second.",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=30, help="Seconds of arrivals per rate."
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=64,
+        help="Maximum requests in flight; later arrivals wait in a client queue.",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=60, help="Per-request timeout in seconds."
+    )
+    parser.add_argument(
+        "--slo-p95",
+        type=float,
+        default=10.0,
+        help="p95 latency (seconds) above which a rate counts as saturated.",
+    )
+    parser.add_argument(
+        "--all-rates",
+        action="store_true",
+        help="Keep stepping through the rates after the server saturates.",
+    )
+    parser.add_argument(
+        "--spawn-server",
+        action="store_true",
+        help="Start api.py for the test and stop it afterwards.",
+    )
+    parser.add_argument(
+        "--fake-backends",
+        action="store_true",
+        help="With --spawn-server, use the fake embedding and LLM backends.",
+    )
+    parser.add_argument(
+        "--fake-llm-latency",
+        type=float,
+        default=0.5,
+        help="Simulated LLM latency in seconds for --fake-backends.",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    parser.add_argument(
+        "--report", default="load_test_report.json", help="Where to write the report."
+    )
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions)
+    rates = [float(rate) for rate in args.rates.split(",")]
+    random.seed(args.seed)
+
+    server = None
+    url = args.url
+    scratch_dir = tempfile.TemporaryDirectory(prefix="load-test-")
+    if args.spawn_server:
+        server, url = spawn_server(
+            args.fake_backends, args.fake_llm_latency, scratch_dir.name
+        )
+
+    try:
+        steps = []
+        for rate in rates:
+            print(f"🚦 {rate:g} req/s for {args.duration:g}s...")
+            step = run_step(
+                f"{url.rstrip('/')}{args.endpoint}",
+                questions,
+                rate,
+                args.duration,
+                args.concurrency,
+                args.timeout,
+            )
+            step["saturated"] = is_saturated(step, args.slo_p95)
+            steps.append(step)
+            print_step(step)
+            if step["saturated"] and not args.all_rates:
+                break
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        scratch_dir.cleanup()
+
+    report = build_report(steps, args, url)
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print()
+    print_summary(report)
+    print(f"📄 Report written to {args.report}")
+
+
+def load_questions(path: str = None) -> List[str]:
+    if path is None:
+        return DEFAULT_QUESTIONS
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def spawn_server(fake_backends: bool, fake_llm_latency: float, scratch_dir: str):
+    """
+    Start the API on a free port and wait until it answers health checks.
+
+    With fake backends, the answers the server precomputes go to scratch_dir
+    rather than next to the real index, and questions aren't logged.
+    """
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    env = dict(os.environ)
+    if fake_backends:
+        env.update(
+            EMBEDDING_BACKEND="fake",
+            LLM_BACKEND="fake",
+            FAKE_LLM_LATENCY=str(fake_llm_latency),
+            # Fake embeddings are random, so every chunk looks irrelevant.
+            RAG_MAX_DISTANCE="inf",
+            # Fake answers must never be served by the real API.
+            RAG_PRECOMPUTED_ANSWERS=os.path.join(
+                scratch_dir, "precomputed_answers.json"
+            ),
+        )
+        env.pop("RAG_QUERY_LOG", None)
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "api:app",
+            "--app-dir",
+            app_dir,
+            "--port",
+            str(port),
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=1) as response:
+                health = json.loads(response.read())
+            if not health["database_loaded"]:
+                server.terminate()
+                raise SystemExit(
+                    "❌ Database not found. Please run populate_database.py first."
+                )
+            print(f"🚀 Started API at {url}")
+            return server, url
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("❌ The API didn't start within 60 seconds")
+
+
+def send_request(url: str, question: str, timeout: float) -> Tuple[str, bool]:
+    """
+    POST one question; return the status ("ok", "error" or "timeout") and
+    whether the API served a precomputed answer.
+    """
+    request = urllib.request.Request(
+        url,
+        data=json.dumps({"question": question}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read()
+    except socket.timeout:
+        return "timeout", False
+    except urllib.error.URLError as e:
+        return ("timeout" if isinstance(e.reason, socket.timeout) else "error"), False
+    except Exception:
+        return "error", False
+
+    try:
+        precomputed = bool(json.loads(body).get("precomputed"))
+    except (ValueError, AttributeError):
+        precomputed = False
+    return "ok", precomputed
+
+
+def run_step(
+    url: str,
+    questions: List[str],
+    rate: float,
+    duration: float,
+    concurrency: int,
+    timeout: float,
+) -> Dict:
+    """Send Poisson arrivals at rate for duration seconds and record outcomes."""
+    outcomes = []  # (due time, latency, status, precomputed)
+    lock = threading.Lock()
+    state = {"outstanding": 0, "in_flight": 0}
+
+    def worker(question: str, due: float):
+        with lock:
+            state["in_flight"] += 1
+        status, precomputed = send_request(url, question, timeout)
+        finished = time.perf_counter()
+        with lock:
+            state["in_flight"] -= 1
+            state["outstanding"] -= 1
+            outcomes.append((due, finished - due, status, precomputed))
+
+    # Sample how many requests are waiting or in flight while the step runs.
+    queue_samples = []
+    sampling = threading.Event()
+
+    def sample_queue():
+        while not sampling.wait(QUEUE_SAMPLE_INTERVAL):
+            with lock:
+                queue_samples.append(
+                    {
+                        "t": round(time.perf_counter() - start, 3),
+                        "outstanding": state["outstanding"],
+                        "in_flight": state["in_flight"],
+                    }
+                )
+
+    start = time.perf_counter()
+    sampler = threading.Thread(target=sample_queue, daemon=True)
+    sampler.start()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        due = start
+        while True:
+            due += random.expovariate(rate)
+            if due - start > duration:
+                break
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            with lock:
+                state["outstanding"] += 1
+            executor.submit(worker, random.choice(questions), due)
+        # Leaving the block waits for every request to finish.
+
+    end = time.perf_counter()
+    sampling.set()
+    sampler.join()
+
+    return summarize_step(rate, duration, outcomes, start, end, queue_samples)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize_step(
+    rate: float,
+    duration: float,
+    outcomes: List[tuple],
+    start: float,
+    end: float,
+    queue_samples,
+) -> Dict:
+    successes = [outcome for outcome in outcomes if outcome[2] == "ok"]
+    latencies = [latency for _due, latency, _status, _precomputed in successes]
+    # Precomputed answers skip the RAG pipeline, so their latency is reported
+    # separately from that of the answers generated for the request.
+    precomputed_latencies = [outcome[1] for outcome in successes if outcome[3]]
+    pipeline_latencies = [outcome[1] for outcome in successes if not outcome[3]]
+    total = len(outcomes)
+    errors = sum(1 for outcome in outcomes if outcome[2] == "error")
+    timeouts = sum(1 for outcome in outcomes if outcome[2] == "timeout")
+    elapsed = end - start
+    return {
+        "offered_rps": rate,
+        # Poisson arrivals vary around the offered rate; compare against these.
+        "arrival_rps": total / duration,
+        "requests": total,
+        "achieved_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "error_rate": errors / total if total else 0.0,
+        "timeout_rate": timeouts / total if total else 0.0,
+        "latency_p50": percentile(latencies, 0.50),
+        "latency_p90": percentile(latencies, 0.90),
+        "latency_p95": percentile(latencies, 0.95),
+        "latency_p99": percentile(latencies, 0.99),
+        "latency_max": max(latencies, default=0.0),
+        "precomputed_rate": (
+            len(precomputed_latencies) / len(successes) if successes else 0.0
+        ),
+        "precomputed_latency_p50": percentile(precomputed_latencies, 0.50),
+        "precomputed_latency_p95": percentile(precomputed_latencies, 0.95),
+        "pipeline_latency_p50": percentile(pipeline_latencies, 0.50),
+        "pipeline_latency_p95": percentile(pipeline_latencies, 0.95),
+        "max_queue_depth": max((s["outstanding"] for s in queue_samples), default=0),
+        "queue_depth": queue_samples,
+    }
+
+
+def is_saturated(step: Dict, slo_p95: float) -> bool:
+    return (
+        step["achieved_rps"] < MIN_THROUGHPUT_RATIO * step["arrival_rps"]
+        or step["error_rate"] + step["timeout_rate"] > MAX_FAILURE_RATE
+        or step["latency_p95"] > slo_p95
+    )
+
+
+def build_report(steps: List[Dict], args, url: str) -> Dict:
+    sustained = [step for step in steps if not step["saturated"]]
+    saturated = [step for step in steps if step["saturated"]]
+    return {
+        "url": url,
+        "endpoint": args.endpoint,
+        "fake_backends": args.spawn_server and args.fake_backends,
+        "concurrency": args.concurrency,
+        "duration_per_rate": args.duration,
+        "slo_p95": args.slo_p95,
+        "max_sustained_rps": max((s["offered_rps"] for s in sustained), default=0.0),
+        "saturation_rps": saturated[0]["offered_rps"] if saturated else None,
+        "peak_throughput_rps": max((s["achieved_rps"] for s in steps), default=0.0),
+        "steps": steps,
+    }
+
+
+def print_step(step: Dict):
+    flag = "🔴 saturated" if step["saturated"] else "🟢"
+    print(
+        f"   achieved {step['achieved_rps']:.2f} req/s | "
+        f"p50 {step['latency_p50']:.2f}s p95 {step['latency_p95']:.2f}s "
+        f"p99 {step['latency_p99']:.2f}s | errors {step['error_rate']:.1%} "
+        f"timeouts {step['timeout_rate']:.1%} | "
+        f"max queue {step['max_queue_depth']} {flag}"
+    )
+    if step["precomputed_rate"]:
+        print(
+            f"   precomputed {step['precomputed_rate']:.0%} "
+            f"(p95 {step['precomputed_latency_p95']:.2f}s) | "
+            f"pipeline p50 {step['pipeline_latency_p50']:.2f}s "
+            f"p95 {step['pipeline_latency_p95']:.2f}s"
+        )
+
+
+def print_summary(report: Dict):
+    print("📊 Capacity report")
+    print(
+        f"{'Offered':>8} {'Achieved':>9} {'p50':>7} {'p95':>7} {'p99':>7} "
+        f"{'Errors':>7} {'Timeouts':>9} {'Queue':>6} {'Precomp':>8} "
+        f"{'Pipe p95':>9}"
+    )
+    for step in report["steps"]:
+        print(
+            f"{step['offered_rps']:>8.2f} {step['achieved_rps']:>9.2f} "
+            f"{step['latency_p50']:>6.2f}s {step['latency_p95']:>6.2f}s "
+            f"{step['latency_p99']:>6.2f}s {step['error_rate']:>7.1%} "
+            f"{step['timeout_rate']:>9.1%} {step['max_queue_depth']:>6} "
+            f"{step['precomputed_rate']:>8.0%} {step['pipeline_latency_p95']:>8.2f}s"
+        )
+    print(f"Max sustained rate: {report['max_sustained_rps']:g} req/s")
+    if report["saturation_rps"] is not None:
+        print(f"Saturates at: {report['saturation_rps']:g} req/s")
+    else:
+        print("Did not saturate at the tested rates")
+    print(f"Peak throughput: {report['peak_throughput_rps']:.2f} req/s")
+    if any(step["precomputed_rate"] for step in report["steps"]):
+        print(
+            "⚠️  Some answers were precomputed and skipped the RAG pipeline; "
+            "use --questions with uncached questions to measure the pipeline alone"
+        )
+
+
+if __name__ == "__main__":
+    main()
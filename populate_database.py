@@ -1,58 +1,265 @@
+from __future__ import annotations
+
 import argparse
 import os
 import shutil
+import time
+import uuid
+from typing import TYPE_CHECKING
 
-from langchain.schema.document import Document
-from langchain_chroma import Chroma
-from langchain_community.document_loaders import PyPDFDirectoryLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import rag_client
+from chunking import CHUNKING_PRESETS, DEFAULT_CHUNKING_PRESET, chunk_stats
+from chunking import split_documents as split_with_preset
+from get_embedding_function import EMBEDDING_MODEL, get_embedding_function
+from precomputed_answers import load_frequent_questions, precompute_answers
+from vector_store import (
+    CHROMA_PATH,
+    DEFAULT_COLLECTION,
+    load_manifest,
+    partition_name,
+    save_manifest,
+)
 
-from get_embedding_function import get_embedding_function
+# LangChain and Chroma are imported inside the functions that use them, so
+# `--help` and argument errors don't pay for loading them.
+if TYPE_CHECKING:
+    from langchain.schema.document import Document
 
-CHROMA_PATH = "chroma"
 DATA_PATH = "data"
 
+ESTIMATED_TOKENS_NOTE = (
+    "   ⚠️  Token counts are estimated (about 4 characters per token) because "
+    "the embedding tokenizer couldn't be loaded; install it with "
+    "`uv sync --extra tokenizer` for exact counts"
+)
+
 
 def main():
 
     # Check if the database should be cleared (using the --clear flag).
     parser = argparse.ArgumentParser()
     parser.add_argument("--reset", action="store_true", help="Reset the database.")
+    parser.add_argument(
+        "--chunking",
+        choices=sorted(CHUNKING_PRESETS),
+        default=DEFAULT_CHUNKING_PRESET,
+        help="Chunking preset to use. Combine with --reset when switching presets, "
+        "since existing chunk IDs are not re-embedded.",
+    )
+    parser.add_argument(
+        "--compare-chunking",
+        action="store_true",
+        help="Print chunk statistics for every preset without touching the database.",
+    )
+    parser.add_argument(
+        "--no-embedding-cache",
+        action="store_true",
+        help="Embed every new chunk instead of reusing cached embeddings.",
+    )
+    parser.add_argument(
+        "--partition-by-source",
+        action="store_true",
+        help="Store each source PDF in its own collection, so queries filtered "
+        "by game only search that game's chunks. Requires --reset to switch an "
+        "existing database between layouts.",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="Profile the run with cProfile and write the stats to PATH "
+        "(view them with `python -m pstats PATH` or snakeviz).",
+    )
+    parser.add_argument(
+        "--no-precompute",
+        action="store_true",
+        help="Skip precomputing the answers to frequent questions after indexing.",
+    )
     args = parser.parse_args()
+
+    if args.profile:
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        profiler.runcall(populate, args)
+        profiler.dump_stats(args.profile)
+        print(f"⏱️  Profile written to {args.profile}. Top functions:")
+        pstats.Stats(args.profile).sort_stats("cumulative").print_stats(15)
+    else:
+        populate(args)
+
+
+def populate(args):
+    documents = load_documents()
+    if args.compare_chunking:
+        compare_chunking_presets(documents)
+        return
+
     if args.reset:
         print("✨ Clearing Database")
         clear_database()
 
     # Create (or update) the data store.
-    documents = load_documents()
-    chunks = split_documents(documents)
-    add_to_chroma(chunks)
+    split_start = time.perf_counter()
+    chunks = split_documents(documents, args.chunking)
+    split_seconds = time.perf_counter() - split_start
+
+    index_start = time.perf_counter()
+    add_to_chroma(
+        chunks,
+        use_embedding_cache=not args.no_embedding_cache,
+        partition_by_source=args.partition_by_source,
+    )
+    index_seconds = time.perf_counter() - index_start
+
+    stats = chunk_stats(chunks)
+    print(f"📊 Chunking preset: {args.chunking}")
+    print(f"   Chunks: {stats['chunks']}")
+    print(f"   Average tokens per chunk: {stats['avg_tokens']:.1f}")
+    print(f"   Total tokens: {stats['total_tokens']}")
+    if stats["estimated"]:
+        print(ESTIMATED_TOKENS_NOTE)
+    print(f"   Splitting time: {split_seconds:.2f}s")
+    print(f"   Indexing time: {index_seconds:.2f}s")
+
+    if not args.no_precompute:
+        warm_precomputed_answers()
+
+
+def warm_precomputed_answers():
+    # Answer the frequent questions now, so the API can serve them instantly.
+    questions = load_frequent_questions()
+    if not questions:
+        return
+    # A running API notices the new index version and regenerates the answers
+    # itself; doing it here as well would compute every answer twice.
+    if rag_client.api_is_running():
+        print("🔥 The running API will regenerate the precomputed answers")
+        return
+
+    print(f"🔥 Precomputing answers for {len(questions)} frequent questions")
+    precompute_start = time.perf_counter()
+    try:
+        store = precompute_answers(questions)
+    except Exception as e:
+        # The index is already written, so this isn't fatal: the API
+        # generates the answers once it can reach the LLM.
+        print(f"⚠️  Could not precompute answers ({e}); the API will retry")
+        return
+    print(
+        f"   Index version {store['index_version']}, "
+        f"{time.perf_counter() - precompute_start:.2f}s"
+    )
 
 
 def load_documents():
+    from langchain_community.document_loaders import PyPDFDirectoryLoader
+
     document_loader = PyPDFDirectoryLoader(DATA_PATH)
     return document_loader.load()
 
 
-def split_documents(documents: list[Document]):
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1200,
-        chunk_overlap=200,
-        length_function=len,
-        is_separator_regex=False,
-    )
-    return text_splitter.split_documents(documents)
+def split_documents(
+    documents: list[Document], preset_name: str = DEFAULT_CHUNKING_PRESET
+):
+    return split_with_preset(documents, preset_name)
 
 
-def add_to_chroma(chunks: list[Document]):
-    # Load the existing database.
-    db = Chroma(
-        persist_directory=CHROMA_PATH, embedding_function=get_embedding_function()
+def compare_chunking_presets(documents: list[Document]):
+    # Split with every preset and report what each would cost to embed.
+    print(
+        f"{'Preset':<12} {'Chunks':>7} {'Avg tokens':>11} {'Max tokens':>11} "
+        f"{'Total tokens':>13} {'Split time':>11}"
     )
+    for preset_name in CHUNKING_PRESETS:
+        split_start = time.perf_counter()
+        chunks = split_documents(documents, preset_name)
+        split_seconds = time.perf_counter() - split_start
+        stats = chunk_stats(chunks)
+        print(
+            f"{preset_name:<12} {stats['chunks']:>7} {stats['avg_tokens']:>11.1f} "
+            f"{stats['max_tokens']:>11} {stats['total_tokens']:>13} "
+            f"{split_seconds:>10.2f}s"
+        )
+    if stats["estimated"]:
+        print(ESTIMATED_TOKENS_NOTE)
+
+
+def add_to_chroma(
+    chunks: list[Document],
+    use_embedding_cache: bool = True,
+    partition_by_source: bool = False,
+):
+    from embedding_cache import CachedEmbeddings
+
+    # Switching layouts would leave chunks behind in the old collections.
+    manifest = load_manifest()
+    if os.path.exists(CHROMA_PATH) and manifest["partitioned"] != partition_by_source:
+        layout = (
+            "per-source collections" if manifest["partitioned"] else "one collection"
+        )
+        raise SystemExit(
+            f"❌ The existing database uses {layout}. "
+            "Run with --reset to rebuild it in the requested layout."
+        )
+
+    # Reuse stored embeddings for chunk texts we have embedded before.
+    embedding_function = get_embedding_function()
+    if use_embedding_cache:
+        embedding_function = CachedEmbeddings(embedding_function, EMBEDDING_MODEL)
 
     # Calculate Page IDs.
     chunks_with_ids = calculate_chunk_ids(chunks)
 
+    # Group the chunks by the collection they are stored in.
+    collections = {}
+    for chunk in chunks_with_ids:
+        if partition_by_source:
+            collection_name = partition_name(chunk.metadata.get("source", ""))
+        else:
+            collection_name = DEFAULT_COLLECTION
+        collections.setdefault(collection_name, []).append(chunk)
+
+    added = 0
+    for collection_name, collection_chunks in collections.items():
+        if partition_by_source:
+            print(f"📂 Collection: {collection_name}")
+        added += add_to_collection(
+            collection_name, collection_chunks, embedding_function
+        )
+
+    if use_embedding_cache:
+        print(
+            f"🗄️  Embedding cache: {embedding_function.hits} reused, "
+            f"{embedding_function.misses} embedded"
+        )
+        embedding_function.close()
+
+    # Record the layout and the indexed sources for queries and /games. The
+    # version changes whenever chunks are added, which tells the API that its
+    # precomputed answers are stale.
+    manifest["partitioned"] = partition_by_source
+    if added or "version" not in manifest:
+        manifest["version"] = uuid.uuid4().hex[:12]
+    for collection_name, collection_chunks in collections.items():
+        for chunk in collection_chunks:
+            source = chunk.metadata.get("source", "")
+            manifest["sources"][source] = {"collection": collection_name, "chunks": 0}
+        for chunk in collection_chunks:
+            manifest["sources"][chunk.metadata.get("source", "")]["chunks"] += 1
+    save_manifest(manifest)
+
+
+def add_to_collection(collection_name: str, chunks: list[Document], embedding_function):
+    from langchain_chroma import Chroma
+
+    # Load the existing database.
+    db = Chroma(
+        collection_name=collection_name,
+        persist_directory=CHROMA_PATH,
+        embedding_function=embedding_function,
+    )
+
     # Add or Update the documents.
     existing_items = db.get(include=[])  # IDs are always included by default
     existing_ids = set(existing_items["ids"])
@@ -60,7 +267,7 @@ def add_to_chroma(chunks: list[Document]):
 
     # Only add documents that don't exist in the DB.
     new_chunks = []
-    for chunk in chunks_with_ids:
+    for chunk in chunks:
         if chunk.metadata["id"] not in existing_ids:
             new_chunks.append(chunk)
 
@@ -70,6 +277,7 @@ def add_to_chroma(chunks: list[Document]):
         db.add_documents(new_chunks, ids=new_chunk_ids)
     else:
         print("✅ No new documents to add")
+    return len(new_chunks)
 
 
 def calculate_chunk_ids(chunks):
@@ -0,0 +1,260 @@
+"""
+Precomputed answers for frequently asked questions.
+
+A handful of questions ("How do you win in Monopoly?") make up much of the
+traffic, so their answers are computed ahead of time and /query serves them
+without retrieval or generation:
+
+- the questions come from frequent_questions.txt (one per line) and, when the
+  API logs questions to RAG_QUERY_LOG, from the most frequently asked ones
+- populate_database.py computes the answers after indexing and stores them in
+  the Chroma directory together with the version of the index they came from
+  and a fingerprint of the pipeline settings (models, prompt, thresholds)
+- when either changes, the API regenerates the answers in the background
+  (retrying every minute while the LLM is unreachable) and answers questions
+  normally until they are ready
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from vector_store import CHROMA_PATH, MANIFEST_PATH, load_manifest
+
+FREQUENT_QUESTIONS_PATH = os.environ.get(
+    "RAG_FREQUENT_QUESTIONS", "frequent_questions.txt"
+)
+# Unset by default, since logged questions can contain user data.
+QUERY_LOG_PATH = os.environ.get("RAG_QUERY_LOG")
+PRECOMPUTED_ANSWERS_PATH = os.environ.get(
+    "RAG_PRECOMPUTED_ANSWERS", os.path.join(CHROMA_PATH, "precomputed_answers.json")
+)
+
+# Logged questions asked at least this often are precomputed, up to the limit.
+MIN_QUESTION_COUNT = 3
+MAX_MINED_QUESTIONS = 20
+
+# Wait this long before retrying a failed regeneration (e.g. LLM not up yet).
+REFRESH_RETRY_SECONDS = 60
+
+_log_lock = threading.Lock()
+
+
+def normalize_question(question: str) -> str:
+    """Lookup key for a question: lowercase, single spaces, no final punctuation."""
+    question = re.sub(r"\s+", " ", question.lower()).strip()
+    return question.rstrip("?!. ")
+
+
+def log_question(question: str):
+    """Append the question to the query log, if one is configured."""
+    if QUERY_LOG_PATH is None:
+        return
+    entry = {"time": datetime.now().isoformat(), "question": question}
+    with _log_lock, open(QUERY_LOG_PATH, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def mine_query_log(
+    path: str,
+    min_count: int = MIN_QUESTION_COUNT,
+    limit: int = MAX_MINED_QUESTIONS,
+) -> List[str]:
+    """Return the most frequently logged questions, most frequent first."""
+    counts = Counter()
+    examples = {}
+    with open(path) as f:
+        for line in f:
+            try:
+                question = json.loads(line)["question"]
+            except (ValueError, KeyError, TypeError):
+                continue
+            key = normalize_question(question)
+            counts[key] += 1
+            examples.setdefault(key, question)
+    return [
+        examples[key] for key, count in counts.most_common(limit) if count >= min_count
+    ]
+
+
+def load_frequent_questions() -> List[str]:
+    """Configured frequent questions, followed by those mined from the query log."""
+    questions = []
+    if os.path.exists(FREQUENT_QUESTIONS_PATH):
+        with open(FREQUENT_QUESTIONS_PATH) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    questions.append(line)
+    if QUERY_LOG_PATH is not None and os.path.exists(QUERY_LOG_PATH):
+        questions.extend(mine_query_log(QUERY_LOG_PATH))
+
+    unique = {}
+    for question in questions:
+        unique.setdefault(normalize_question(question), question)
+    return list(unique.values())
+
+
+def load_precomputed_answers() -> Optional[Dict]:
+    if not os.path.exists(PRECOMPUTED_ANSWERS_PATH):
+        return None
+    with open(PRECOMPUTED_ANSWERS_PATH) as f:
+        return json.load(f)
+
+
+def save_precomputed_answers(store: Dict):
+    # Write to a temporary file first, so a running API never reads half a file.
+    # The name is unique to the writer, in case two processes save at once.
+    temporary_path = (
+        f"{PRECOMPUTED_ANSWERS_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    with open(temporary_path, "w") as f:
+        json.dump(store, f, indent=2)
+    os.replace(temporary_path, PRECOMPUTED_ANSWERS_PATH)
+
+
+def current_version() -> Dict:
+    """The index version and pipeline fingerprint stored answers must match."""
+    from query_data_enhanced import pipeline_fingerprint
+
+    return {
+        "index_version": load_manifest().get("version"),
+        "pipeline": pipeline_fingerprint(),
+    }
+
+
+def is_current(store: Optional[Dict], version: Dict) -> bool:
+    return store is not None and all(
+        store.get(key) == value for key, value in version.items()
+    )
+
+
+def precompute_answers(questions: List[str]) -> Dict:
+    """
+    Answer the questions against the current index and store the answers.
+
+    Answers already stored for the same index and pipeline are kept rather
+    than generated again.
+    """
+    from query_data_enhanced import query_rag_structured
+
+    version = current_version()
+    previous = load_precomputed_answers()
+    if is_current(previous, version):
+        reusable = previous["answers"]
+    else:
+        reusable = {}
+
+    answers = {}
+    for question in questions:
+        key = normalize_question(question)
+        if key in reusable:
+            answers[key] = reusable[key]
+            continue
+        result = query_rag_structured(question)
+        answers[key] = {
+            "question": question,
+            "answer": result["answer"],
+            "sources": result["sources"],
+            "retrieval": result["retrieval"],
+        }
+
+    store = {
+        **version,
+        "created": datetime.now().isoformat(),
+        "answers": answers,
+    }
+    save_precomputed_answers(store)
+    return store
+
+
+def file_mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class PrecomputedAnswers:
+    """Serves precomputed answers, and keeps them in step with the index."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.answers = {}
+        self.file_mtimes = None
+        self.fresh = False
+        self.refreshing = False
+        self.retry_at = 0.0
+
+    def lookup(self, question: str) -> Optional[Dict]:
+        """Return the stored answer and sources for the question, if any."""
+        self.check_index()
+        return self.answers.get(normalize_question(question))
+
+    def check_index(self):
+        """Reload the answers, or regenerate them, when the index has changed."""
+        # Checking modification times keeps the lookup cheap; the files are
+        # only read again after populate_database.py or a refresh wrote them.
+        # Stale answers are checked again once a failed refresh may be retried.
+        file_mtimes = (file_mtime(MANIFEST_PATH), file_mtime(PRECOMPUTED_ANSWERS_PATH))
+        with self.lock:
+            if file_mtimes == self.file_mtimes and (
+                self.fresh or self.refreshing or time.monotonic() < self.retry_at
+            ):
+                return
+            self.file_mtimes = file_mtimes
+
+        if not os.path.exists(CHROMA_PATH):
+            self.answers = {}
+            self.fresh = True
+            return
+
+        store = load_precomputed_answers()
+        if is_current(store, current_version()):
+            self.answers = store["answers"]
+            self.fresh = True
+        else:
+            # Answers from an older index or other settings (a different LLM,
+            # prompt or fake backends) must not be served.
+            self.answers = {}
+            self.fresh = False
+            self.refresh_in_background()
+
+    def refresh_in_background(self):
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        threading.Thread(
+            target=self.refresh, name="precompute-answers", daemon=True
+        ).start()
+
+    def refresh(self):
+        # Only the API refreshes answers, so logging stays off the CLI path.
+        import logging
+
+        logger = logging.getLogger(__name__)
+        # A successful refresh rewrites the answers file, which triggers a
+        # reload straight away; otherwise wait before trying again.
+        self.retry_at = time.monotonic() + REFRESH_RETRY_SECONDS
+        try:
+            questions = load_frequent_questions()
+            if questions:
+                logger.info(f"Precomputing answers for {len(questions)} questions")
+                store = precompute_answers(questions)
+                logger.info(
+                    f"Precomputed answers ready for index {store['index_version']}"
+                )
+        except Exception as e:
+            logger.warning(
+                f"Could not precompute answers: {e}. "
+                f"Retrying in {REFRESH_RETRY_SECONDS} s"
+            )
+        finally:
+            with self.lock:
+                self.refreshing = False
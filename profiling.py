@@ -0,0 +1,164 @@
+"""
+Opt-in profiling for the RAG pipeline.
+
+- StageTimer records how long each stage of a query takes.
+- The slow-query log appends one JSON line per query slower than
+  RAG_SLOW_QUERY_MS milliseconds to RAG_SLOW_QUERY_LOG (default
+  slow_queries.jsonl), with the question hash, retrieved chunk IDs, prompt
+  token count and per-stage timings. It is disabled unless RAG_SLOW_QUERY_MS
+  is set.
+- sample_profile() is a small sampling profiler for a running process: it
+  periodically records the stack of every thread, so it sees the request
+  threads without instrumenting them. The API exposes it at /admin/profile.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+def parse_slow_query_ms(value: Optional[str]) -> Optional[float]:
+    """Threshold of the slow-query log in milliseconds, or None if disabled."""
+    if value is None:
+        return None
+    try:
+        threshold = float(value)
+    except ValueError:
+        threshold = None
+    # Negative, infinite and NaN thresholds are invalid too.
+    if threshold is None or not 0 <= threshold < float("inf"):
+        import logging
+
+        logging.getLogger(__name__).warning(
+            f"Ignoring invalid RAG_SLOW_QUERY_MS={value!r}; "
+            "the slow-query log is disabled"
+        )
+        return None
+    return threshold
+
+
+SLOW_QUERY_MS = parse_slow_query_ms(os.environ.get("RAG_SLOW_QUERY_MS"))
+SLOW_QUERY_LOG_PATH = os.environ.get("RAG_SLOW_QUERY_LOG", "slow_queries.jsonl")
+
+_log_lock = threading.Lock()
+
+
+class StageTimer:
+    """Collects the duration of named pipeline stages, in milliseconds."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        stage_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = (time.perf_counter() - stage_start) * 1000
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+
+def question_hash(question: str) -> str:
+    import hashlib
+
+    # Questions can contain user data, so only a hash is logged.
+    return hashlib.sha256(question.encode("utf-8")).hexdigest()[:16]
+
+
+def log_if_slow(
+    question: str, retrieved_ids: List[str], prompt: str, timer: StageTimer
+) -> Optional[Dict]:
+    """Append the query to the slow-query log if it exceeded the threshold."""
+    if SLOW_QUERY_MS is None:
+        return None
+    total_ms = timer.total_ms()
+    if total_ms < SLOW_QUERY_MS:
+        return None
+
+    # Only needed once a query is slow, so kept off the CLI startup path.
+    import json
+    import logging
+    from datetime import datetime
+
+    from chunking import get_token_counter
+
+    entry = {
+        "time": datetime.now().isoformat(),
+        "question_hash": question_hash(question),
+        "total_ms": round(total_ms, 1),
+        "stages_ms": {name: round(ms, 1) for name, ms in timer.timings.items()},
+        "retrieved_ids": retrieved_ids,
+        "prompt_tokens": get_token_counter()(prompt),
+    }
+    logging.getLogger("rag.slow_query").warning(
+        f"Slow query {entry['question_hash']}: {entry['total_ms']} ms "
+        f"{entry['stages_ms']}"
+    )
+    with _log_lock, open(SLOW_QUERY_LOG_PATH, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+    return entry
+
+
+def sample_profile(seconds: float, interval: float = 0.005, top: int = 25) -> Dict:
+    """
+    Sample the stacks of all other threads for the given number of seconds.
+
+    Returns the most frequent functions by self time (top of the stack) and by
+    cumulative time (anywhere on the stack), plus all stacks in the collapsed
+    "frame;frame;frame count" format used by flame graph tools.
+    """
+    own_thread = threading.get_ident()
+    thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks = Counter()
+    samples = 0
+
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                location = f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}"
+                stack.append(f"{code.co_name} ({location})")
+                frame = frame.f_back
+            thread_name = thread_names.get(thread_id, str(thread_id))
+            stacks[(thread_name,) + tuple(reversed(stack))] += 1
+        samples += 1
+        time.sleep(interval)
+
+    self_counts = Counter()
+    cumulative_counts = Counter()
+    for stack, count in stacks.items():
+        functions = stack[1:]
+        if functions:
+            self_counts[functions[-1]] += count
+        for function in set(functions):
+            cumulative_counts[function] += count
+
+    total = sum(stacks.values()) or 1
+    return {
+        "seconds": seconds,
+        "interval": interval,
+        "samples": samples,
+        "top_self": [
+            {"function": function, "samples": count, "percent": 100 * count / total}
+            for function, count in self_counts.most_common(top)
+        ],
+        "top_cumulative": [
+            {"function": function, "samples": count, "percent": 100 * count / total}
+            for function, count in cumulative_counts.most_common(top)
+        ],
+        "collapsed": "\n".join(
+            f"{';'.join(stack)} {count}" for stack, count in stacks.most_common()
+        ),
+    }
@@ -1,13 +1,53 @@
 import argparse
-from typing import Any, Dict, List, Tuple
-
-from langchain.prompts import ChatPromptTemplate
-from langchain_chroma import Chroma
-from langchain_ollama import OllamaLLM
-
-from get_embedding_function import get_embedding_function
-
-CHROMA_PATH = "chroma"
+import json
+import os
+import sys
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import rag_client
+from get_embedding_function import EMBEDDING_MODEL
+from profiling import SLOW_QUERY_MS, StageTimer, log_if_slow
+from vector_store import (
+    CHROMA_PATH,
+    UnknownSourceError,
+    embed_query,
+    get_collection,
+    indexed_sources,
+    resolve_sources,
+    similarity_search,
+)
+
+LLM_MODEL = "llama3.2"
+
+# Select the LLM backend with LLM_BACKEND ("ollama" or "fake", see fake_backends.py).
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "ollama")
+
+# Adaptive retrieval, based on Chroma's distances (lower is closer):
+# - candidates farther than MAX_DISTANCE are not relevant, and when none is
+#   left the query is answered with NOT_ENOUGH_INFORMATION without the LLM
+# - only candidates within DEPTH_RATIO of the best distance are kept (at most
+#   MAX_CHUNKS), so a match much closer than the rest is sent on its own
+# The default MAX_DISTANCE suits normalized embeddings such as Ollama's
+# nomic-embed-text (2 means unrelated); set RAG_MAX_DISTANCE=inf to disable
+# the early exit, e.g. for the fake or Bedrock embeddings.
+RETRIEVAL_K = int(os.environ.get("RAG_RETRIEVAL_K", "8"))
+MAX_CHUNKS = int(os.environ.get("RAG_MAX_CHUNKS", "5"))
+MAX_DISTANCE = float(os.environ.get("RAG_MAX_DISTANCE", "1.2"))
+DEPTH_RATIO = float(os.environ.get("RAG_DEPTH_RATIO", "0.25"))
+
+NOT_ENOUGH_INFORMATION = (
+    "The provided context doesn't contain enough information to answer this "
+    "question."
+)
+
+# Cleared from the moment a background warm_up() is scheduled until it has
+# finished. Queries wait for it instead of importing the same modules
+# concurrently, which can fail half-way (numpy).
+_warm_up_done = threading.Event()
+_warm_up_done.set()
+_warm_up_lock = threading.Lock()
 
 PROMPT_TEMPLATE = """
 Answer the question based ONLY on the following context. If the context doesn't contain enough information to answer the question, say so clearly.
@@ -31,49 +71,180 @@ def main():
     # Create CLI.
     parser = argparse.ArgumentParser()
     parser.add_argument("query_text", type=str, help="The query text.")
+    parser.add_argument(
+        "--json", action="store_true", help="Print the structured result as JSON."
+    )
+    rag_client.add_filter_arguments(parser)
+    rag_client.add_server_arguments(parser)
     args = parser.parse_args()
     query_text = args.query_text
-    result = query_rag_structured(query_text)
-    print(f"Response: {result['answer']}")
-    print(f"Sources: {result['sources']}")
 
-
-def query_rag_structured(query_text: str) -> Dict[str, Any]:
+    # Use a running API or daemon when there is one, otherwise answer in-process.
+    try:
+        result, _answered_by = rag_client.query(
+            query_text,
+            server=args.server,
+            local=args.local,
+            sources=args.sources,
+            games=args.games,
+        )
+    except (
+        UnknownSourceError,
+        rag_client.ServerUnavailable,
+        rag_client.RemoteQueryError,
+    ) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"Response: {result['answer']}")
+        print(f"Sources: {result['sources']}")
+
+
+def query_rag_structured(
+    query_text: str,
+    sources: Optional[List[str]] = None,
+    games: Optional[List[str]] = None,
+) -> Dict[str, Any]:
     """
     Query the RAG system and return structured data.
 
+    Args:
+        sources: Only search these source documents (paths or file names)
+        games: Only search the sources of these games (names or slugs)
+
     Returns:
         Dict containing:
         - answer: str - The response text
         - sources: List[Dict] - List of source documents with metadata
+        - retrieval: Dict - Number of candidates, chunks used (depth), best
+          distance and whether the query exited early without the LLM
+    """
+    # Wait for a background warm_up() to finish loading the dependencies.
+    _warm_up_done.wait()
+
+    # Imported here rather than at module level so the CLI starts quickly.
+    from langchain.prompts import ChatPromptTemplate
+
+    # Time each stage for the slow-query log.
+    timer = StageTimer()
+    with timer.stage("embed"):
+        embedding = embed_query(query_text)
+    with timer.stage("search"):
+        candidates = search_candidates(
+            query_text, sources=sources, games=games, embedding=embedding
+        )
+        filtered_results, retrieval = select_chunks(candidates)
+
+    # Nothing relevant was found, so the LLM could only say so.
+    if retrieval["early_exit"]:
+        log_if_slow(query_text, [], "", timer)
+        return {"answer": NOT_ENOUGH_INFORMATION, "sources": [], "retrieval": retrieval}
+
+    with timer.stage("prompt"):
+        context_text = format_context(filtered_results)
+        prompt_template = ChatPromptTemplate.from_template(PROMPT_TEMPLATE)
+        prompt = prompt_template.format(context=context_text, question=query_text)
+
+    with timer.stage("llm"):
+        model = get_model()
+        response_text = model.invoke(prompt)
+
+    sources = format_sources(filtered_results)
+    log_if_slow(query_text, [source["id"] for source in sources], prompt, timer)
+    return {"answer": response_text, "sources": sources, "retrieval": retrieval}
+
+
+def retrieve(
+    query_text: str,
+    sources: Optional[List[str]] = None,
+    games: Optional[List[str]] = None,
+    embedding: Optional[List[float]] = None,
+) -> Tuple[List[Tuple[Any, float]], Dict[str, Any]]:
     """
-    # Prepare the DB.
-    embedding_function = get_embedding_function()
-    db = Chroma(persist_directory=CHROMA_PATH, embedding_function=embedding_function)
+    Return the (document, distance) pairs used as context for a question, and
+    the retrieval metadata described in select_chunks.
+    """
+    candidates = search_candidates(
+        query_text, sources=sources, games=games, embedding=embedding
+    )
+    return select_chunks(candidates)
 
-    # Search the DB.
-    results = db.similarity_search_with_score(
-        query_text, k=8
+
+def pipeline_fingerprint() -> str:
+    """
+    Hash of the settings besides the index that shape an answer: the
+    embedding and LLM models, the prompt template and the retrieval thresholds.
+    """
+    import hashlib
+
+    settings = {
+        "embedding_model": EMBEDDING_MODEL,
+        "llm_backend": LLM_BACKEND,
+        "llm_model": LLM_MODEL,
+        "prompt": hashlib.sha256(PROMPT_TEMPLATE.encode("utf-8")).hexdigest(),
+        "retrieval": [RETRIEVAL_K, MAX_CHUNKS, MAX_DISTANCE, DEPTH_RATIO],
+    }
+    serialized = json.dumps(settings, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(serialized).hexdigest()[:16]
+
+
+def search_candidates(
+    query_text: str,
+    sources: Optional[List[str]] = None,
+    games: Optional[List[str]] = None,
+    embedding: Optional[List[float]] = None,
+) -> List[Tuple[Any, float]]:
+    """Return the closest (document, distance) pairs, closest first."""
+    # Search the DB, restricted to the requested sources if there are any.
+    selected_sources = resolve_sources(sources, games)
+    results = similarity_search(
+        query_text, k=RETRIEVAL_K, sources=selected_sources, embedding=embedding
     )  # Get more results for filtering
 
-    # Filter results by relevance and source
-    filtered_results = filter_results_by_relevance(query_text, results)
+    # Without an explicit filter, guess the game from the question's keywords
+    if selected_sources is None:
+        return filter_results_by_relevance(query_text, results)
+    return results
 
-    # Limit to top 5 after filtering
-    filtered_results = filtered_results[:5]
 
-    context_text = "\n\n---\n\n".join(
-        [doc.page_content for doc, _score in filtered_results]
-    )
-    prompt_template = ChatPromptTemplate.from_template(PROMPT_TEMPLATE)
-    prompt = prompt_template.format(context=context_text, question=query_text)
+def select_chunks(
+    candidates: List[Tuple[Any, float]],
+) -> Tuple[List[Tuple[Any, float]], Dict[str, Any]]:
+    """
+    Choose how many candidates to use as context, based on their distances.
+
+    Returns the chosen (document, distance) pairs and a description of the
+    choice for the response metadata.
+    """
+    relevant = [(doc, score) for doc, score in candidates if score <= MAX_DISTANCE]
+    if relevant:
+        best_distance = relevant[0][1]
+        cutoff = best_distance + abs(best_distance) * DEPTH_RATIO
+        chosen = [(doc, score) for doc, score in relevant if score <= cutoff]
+        chosen = chosen[:MAX_CHUNKS]
+    else:
+        chosen = []
+
+    retrieval = {
+        "candidates": len(candidates),
+        "depth": len(chosen),
+        "best_distance": float(candidates[0][1]) if candidates else None,
+        "early_exit": not chosen,
+    }
+    return chosen, retrieval
+
 
-    model = OllamaLLM(model="llama3.2")
-    response_text = model.invoke(prompt)
+def format_context(results: List[Tuple[Any, float]]) -> str:
+    return "\n\n---\n\n".join([doc.page_content for doc, _score in results])
 
+
+def format_sources(results: List[Tuple[Any, float]]) -> List[Dict[str, Any]]:
     # Prepare structured sources
     sources = []
-    for doc, score in filtered_results:
+    for doc, score in results:
         source_info = {
             "id": doc.metadata.get("id", ""),
             "source": doc.metadata.get("source", ""),
@@ -86,8 +257,62 @@ def query_rag_structured(query_text: str) -> Dict[str, Any]:
             "score": float(score),
         }
         sources.append(source_info)
+    return sources
+
+
+@lru_cache(maxsize=None)
+def get_model():
+    """Create the LLM client once per process and reuse it for every query."""
+    if LLM_BACKEND == "fake":
+        from fake_backends import get_fake_llm
+
+        return get_fake_llm()
+
+    from langchain_ollama import OllamaLLM
+
+    return OllamaLLM(model=LLM_MODEL)
+
+
+def schedule_warm_up():
+    """
+    Make queries wait for a warm_up() that is about to run in another thread.
+
+    Call this before starting the thread, so that a query arriving before the
+    thread gets going doesn't run the imports alongside it.
+    """
+    _warm_up_done.clear()
+
+
+def warm_up():
+    """
+    Load the query dependencies ahead of the first request.
+
+    Long-running processes (the API and rag_daemon.py) call this at startup so
+    the first query doesn't pay for imports and opening the DB.
+    """
+    with _warm_up_lock:
+        try:
+            _load_query_dependencies()
+        finally:
+            _warm_up_done.set()
+
+
+def _load_query_dependencies():
+    import langchain.prompts  # noqa: F401
+
+    # The slow-query log counts prompt tokens; load the tokenizer now
+    # rather than inside the first slow request.
+    if SLOW_QUERY_MS is not None:
+        from chunking import get_token_counter
+
+        get_token_counter()
 
-    return {"answer": response_text, "sources": sources}
+    # Opening Chroma creates the directory, which would hide a missing DB.
+    if os.path.exists(CHROMA_PATH):
+        sources = indexed_sources().values()
+        for collection_name in {info["collection"] for info in sources}:
+            get_collection(collection_name)
+    get_model()
 
 
 def query_rag(query_text: str) -> str:
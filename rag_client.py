@@ -0,0 +1,208 @@
+"""
+Client side of the RAG CLIs.
+
+query_data.py and query_data_enhanced.py use this to send questions to an
+already running RAG process instead of loading the embedding model, Chroma
+and the LLM themselves. Two kinds of server are supported:
+
+- the FastAPI service (api.py), addressed by an http:// or https:// URL
+- the local daemon (rag_daemon.py), addressed by the path of its Unix socket
+
+Without --server the CLIs look for a running daemon socket, then for the API
+at RAG_API_URL, and answer the question in-process if neither is available.
+Only the standard library is imported here, so a remote query costs a few
+milliseconds of startup.
+"""
+
+import json
+import os
+import socket
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_API_URL = os.environ.get("RAG_API_URL", "http://localhost:8000")
+DEFAULT_SOCKET_PATH = os.environ.get(
+    "RAG_SOCKET", os.path.join(tempfile.gettempdir(), "rag-tutorial.sock")
+)
+
+# Detecting a server must be quick; answering a question can take a while.
+PROBE_TIMEOUT = 0.5
+QUERY_TIMEOUT = 300
+
+
+class ServerUnavailable(Exception):
+    """No RAG server is listening at the given address."""
+
+
+class RemoteQueryError(Exception):
+    """The RAG server was reached but couldn't answer the question."""
+
+
+def add_server_arguments(parser):
+    """Add the --server/--local options shared by the query CLIs."""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--server",
+        metavar="ADDRESS",
+        help="Send the question to a running API (http://...) or daemon socket "
+        "(path), or to whichever is detected with 'auto'. By default a "
+        "detected server is used and the question is answered in-process "
+        "otherwise.",
+    )
+    group.add_argument(
+        "--local",
+        action="store_true",
+        help="Always answer in-process, even if a server is running.",
+    )
+
+
+def add_filter_arguments(parser):
+    """Add the --game/--source filters shared by the query CLIs."""
+    parser.add_argument(
+        "--game",
+        action="append",
+        dest="games",
+        help="Only search this game's rules (name or id, repeatable).",
+    )
+    parser.add_argument(
+        "--source",
+        action="append",
+        dest="sources",
+        help="Only search this source document (path or file name, repeatable).",
+    )
+
+
+def query(
+    question: str,
+    server: Optional[str] = None,
+    local: bool = False,
+    sources: Optional[List[str]] = None,
+    games: Optional[List[str]] = None,
+) -> Tuple[Dict[str, Any], str]:
+    """
+    Answer a question via a running server, or in-process as a fallback.
+
+    server may be an API URL, a socket path, "auto" (require a detected
+    server) or None (use a detected server if there is one). sources and
+    games restrict the search as in query_rag_structured. Returns the
+    structured result and where it was computed ("in-process" or the server
+    address).
+    """
+    request = {"question": question}
+    if sources:
+        request["sources"] = sources
+    if games:
+        request["games"] = games
+
+    if not local:
+        if server in (None, "auto"):
+            address = detect_server()
+            if address is None and server == "auto":
+                raise ServerUnavailable("No running RAG API or daemon was found")
+        else:
+            address = server
+
+        if address is not None:
+            try:
+                return query_server(request, address), address
+            except ServerUnavailable:
+                # An explicitly requested server must be reachable.
+                if server is not None:
+                    raise
+
+    from query_data_enhanced import query_rag_structured
+
+    return query_rag_structured(question, sources=sources, games=games), "in-process"
+
+
+def detect_server() -> Optional[str]:
+    """Return the address of a running daemon or API, if any."""
+    if os.path.exists(DEFAULT_SOCKET_PATH):
+        return DEFAULT_SOCKET_PATH
+    # Anything else listening at the URL (an error status or a body that
+    # isn't the API's JSON) counts as no server.
+    try:
+        health = http_json(f"{DEFAULT_API_URL}/health", timeout=PROBE_TIMEOUT)
+    except (ServerUnavailable, RemoteQueryError):
+        return None
+    if isinstance(health, dict) and health.get("database_loaded"):
+        return DEFAULT_API_URL
+    return None
+
+
+def api_is_running(api_url: str = DEFAULT_API_URL) -> bool:
+    """Whether an API answers health checks at api_url."""
+    try:
+        http_json(f"{api_url.rstrip('/')}/health", timeout=PROBE_TIMEOUT)
+    except (ServerUnavailable, RemoteQueryError):
+        return False
+    return True
+
+
+def query_server(request: Dict[str, Any], address: str) -> Dict[str, Any]:
+    if address.startswith(("http://", "https://")):
+        return query_http(request, address)
+    return query_socket(request, address)
+
+
+def query_http(request: Dict[str, Any], api_url: str) -> Dict[str, Any]:
+    return http_json(
+        f"{api_url.rstrip('/')}/query", payload=request, timeout=QUERY_TIMEOUT
+    )
+
+
+def http_json(
+    url: str, payload: Optional[Dict] = None, timeout: float = QUERY_TIMEOUT
+) -> Dict[str, Any]:
+    # urllib.request pulls in http.client and ssl, so only load it when needed.
+    import urllib.error
+    import urllib.request
+
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    request = urllib.request.Request(
+        url, data=data, headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read()
+    except urllib.error.HTTPError as e:
+        detail = e.read().decode("utf-8", errors="replace")
+        raise RemoteQueryError(f"{url} returned {e.code}: {detail}") from e
+    except (urllib.error.URLError, ConnectionError, socket.timeout) as e:
+        raise ServerUnavailable(f"Could not reach {url}: {e}") from e
+
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise RemoteQueryError(f"{url} didn't return JSON: {e}") from e
+
+
+def query_socket(request: Dict[str, Any], socket_path: str) -> Dict[str, Any]:
+    """Send one JSON request line to the daemon and read one JSON reply line."""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(PROBE_TIMEOUT)
+    try:
+        try:
+            client.connect(socket_path)
+        except (FileNotFoundError, ConnectionError, socket.timeout) as e:
+            raise ServerUnavailable(f"Could not connect to {socket_path}: {e}") from e
+
+        client.settimeout(QUERY_TIMEOUT)
+        with client.makefile("rwb") as stream:
+            stream.write(json.dumps(request).encode("utf-8") + b"\n")
+            stream.flush()
+            try:
+                reply = stream.readline()
+            except socket.timeout as e:
+                raise RemoteQueryError(
+                    f"{socket_path} didn't answer within {QUERY_TIMEOUT} s"
+                ) from e
+    finally:
+        client.close()
+
+    if not reply:
+        raise RemoteQueryError(f"{socket_path} closed the connection without a reply")
+    result = json.loads(reply)
+    if "error" in result:
+        raise RemoteQueryError(result["error"])
+    return result
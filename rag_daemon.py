@@ -0,0 +1,75 @@
+"""
+Lightweight local RAG daemon.
+
+Keeps the embedding client, Chroma and the LLM loaded and answers questions
+sent over a Unix socket, so query_data.py and query_data_enhanced.py can skip
+loading them on every call. Requests and replies are JSON objects, one per
+line; a connection may send several requests.
+
+Usage:
+    uv run python rag_daemon.py
+    uv run python query_data.py "How do you win in Monopoly?"
+"""
+
+import argparse
+import json
+import os
+import signal
+import socketserver
+import sys
+
+from query_data_enhanced import query_rag_structured, warm_up
+from rag_client import DEFAULT_SOCKET_PATH
+
+
+class RAGRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                response = query_rag_structured(
+                    request["question"],
+                    sources=request.get("sources"),
+                    games=request.get("games"),
+                )
+            except Exception as e:
+                response = {"error": f"Error processing query: {str(e)}"}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class RAGDaemon(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--socket",
+        default=DEFAULT_SOCKET_PATH,
+        help=f"Unix socket to listen on (default: {DEFAULT_SOCKET_PATH}).",
+    )
+    args = parser.parse_args()
+
+    print("⏳ Loading RAG dependencies")
+    warm_up()
+
+    # A socket file left behind by a crashed daemon would block the bind.
+    if os.path.exists(args.socket):
+        os.remove(args.socket)
+
+    # Exit cleanly (removing the socket) when stopped by a process manager.
+    signal.signal(signal.SIGTERM, lambda _signum, _frame: sys.exit(0))
+
+    with RAGDaemon(args.socket, RAGRequestHandler) as server:
+        print(f"✅ RAG daemon listening on {args.socket}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import re
+
+import pytest
+from langchain.schema.document import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from chunking import split_by_sections, split_documents
+from populate_database import calculate_chunk_ids
+
+CHUNK_ID = re.compile(r"^.+\.pdf:\d+:\d+$")
+
+
+def make_pages(source: str, pages: list) -> list:
+    return [
+        Document(page_content=text, metadata={"source": source, "page": page})
+        for page, text in enumerate(pages)
+    ]
+
+
+def split(documents: list, chunk_size: int) -> list:
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=0, length_function=len
+    )
+    return split_by_sections(documents, text_splitter, chunk_size, len)
+
+
+def test_sections_continue_across_page_breaks():
+    documents = make_pages(
+        "data/monopoly.pdf",
+        [
+            "SETUP\nPlace the board on a table.\nShuffle the",
+            "Chance cards and deal.\nHOW TO WIN\nBe the last player left.",
+        ],
+    )
+
+    chunks = split(documents, chunk_size=80)
+
+    assert [chunk.page_content.splitlines()[0] for chunk in chunks] == [
+        "SETUP",
+        "HOW TO WIN",
+    ]
+    assert "Chance cards and deal." in chunks[0].page_content
+    assert (chunks[0].metadata["page"], chunks[0].metadata["end_page"]) == (0, 1)
+    assert (chunks[1].metadata["page"], chunks[1].metadata["end_page"]) == (1, 1)
+
+
+def test_oversized_sections_are_split_and_mapped_to_pages():
+    documents = make_pages(
+        "data/ticket_to_ride.pdf",
+        [
+            "SCORING\n"
+            + "\n".join(f"Route of length {n} scores points." for n in range(6)),
+            "\n".join(f"Longest train bonus rule {n}." for n in range(6)),
+        ],
+    )
+
+    chunks = split(documents, chunk_size=100)
+
+    assert len(chunks) > 2
+    assert all(len(chunk.page_content) <= 100 for chunk in chunks)
+    assert chunks[0].metadata["page"] == 0
+    assert chunks[-1].metadata["end_page"] == 1
+    for chunk in chunks:
+        assert chunk.metadata["page"] <= chunk.metadata["end_page"]
+        assert chunk.metadata["source"] == "data/ticket_to_ride.pdf"
+
+
+def test_chunk_ids_are_unique_across_sources_and_pages():
+    documents = make_pages(
+        "data/monopoly.pdf",
+        ["RULES\n" + "Roll the dice and move. " * 20, "JAIL\nGo directly to jail."],
+    ) + make_pages("data/ticket_to_ride.pdf", ["SETUP\n" + "Take train cars. " * 20])
+
+    chunks = calculate_chunk_ids(split(documents, chunk_size=120))
+    ids = [chunk.metadata["id"] for chunk in chunks]
+
+    assert len(ids) == len(set(ids))
+    assert all(CHUNK_ID.match(chunk_id) for chunk_id in ids)
+    for chunk in chunks:
+        source, page, _index = chunk.metadata["id"].rsplit(":", 2)
+        assert source == chunk.metadata["source"]
+        assert int(page) == chunk.metadata["page"]
+
+
+def test_unknown_preset_is_rejected():
+    with pytest.raises(ValueError, match="Unknown chunking preset"):
+        split_documents([], "paragraphs")
@@ -0,0 +1,72 @@
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Records the texts that actually reach the embedding model."""
+
+    embedded: list = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "embedding_cache.sqlite3")
+
+
+def make_cache(cache_path, model_name="fake-embedding"):
+    return CachedEmbeddings(
+        CountingEmbeddings(size=8, embedded=[]), model_name, path=cache_path
+    )
+
+
+def test_counts_hits_and_misses(cache_path):
+    cache = make_cache(cache_path)
+
+    cache.embed_documents(["roll the dice", "buy property"])
+    cache.embed_documents(["buy property", "go to jail"])
+
+    assert cache.misses == 3
+    assert cache.hits == 1
+    assert cache.embeddings.embedded == ["roll the dice", "buy property", "go to jail"]
+
+
+def test_duplicate_texts_are_embedded_once(cache_path):
+    cache = make_cache(cache_path)
+
+    vectors = cache.embed_documents(["free parking", "free parking", "chance"])
+
+    assert cache.embeddings.embedded == ["free parking", "chance"]
+    assert (cache.misses, cache.hits) == (2, 1)
+    assert vectors[0] == vectors[1]
+    assert len(vectors) == 3
+
+
+def test_cache_survives_a_new_instance(cache_path):
+    first = make_cache(cache_path)
+    original = first.embed_documents(["longest route", "train cars"])
+    first.close()
+
+    second = make_cache(cache_path)
+    reused = second.embed_documents(["train cars", "longest route"])
+
+    assert second.embeddings.embedded == []
+    assert (second.misses, second.hits) == (0, 2)
+    # Vectors are stored as float32.
+    assert reused[0] == pytest.approx(original[1], rel=1e-6)
+    assert reused[1] == pytest.approx(original[0], rel=1e-6)
+
+
+def test_model_name_is_part_of_the_key(cache_path):
+    make_cache(cache_path).embed_documents(["destination tickets"])
+
+    other_model = make_cache(cache_path, model_name="other-model")
+    other_model.embed_documents(["destination tickets"])
+
+    assert other_model.misses == 1
+    assert other_model.embeddings.embedded == ["destination tickets"]
@@ -0,0 +1,197 @@
+import json
+import time
+
+import pytest
+
+import precomputed_answers
+import query_data_enhanced
+import vector_store
+from precomputed_answers import (
+    PrecomputedAnswers,
+    current_version,
+    mine_query_log,
+    normalize_question,
+    precompute_answers,
+)
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    """An index at version "v1" in a temporary Chroma directory."""
+    chroma_path = tmp_path / "chroma"
+    chroma_path.mkdir()
+    manifest_path = chroma_path / "index.json"
+    manifest_path.write_text(json.dumps({"version": "v1", "sources": {}}))
+    questions_path = tmp_path / "frequent_questions.txt"
+    questions_path.write_text("# comment\nHow do you win in Monopoly?\n")
+
+    monkeypatch.setattr(vector_store, "MANIFEST_PATH", str(manifest_path))
+    monkeypatch.setattr(precomputed_answers, "MANIFEST_PATH", str(manifest_path))
+    monkeypatch.setattr(precomputed_answers, "CHROMA_PATH", str(chroma_path))
+    monkeypatch.setattr(
+        precomputed_answers,
+        "PRECOMPUTED_ANSWERS_PATH",
+        str(chroma_path / "precomputed_answers.json"),
+    )
+    monkeypatch.setattr(
+        precomputed_answers, "FREQUENT_QUESTIONS_PATH", str(questions_path)
+    )
+    monkeypatch.setattr(precomputed_answers, "QUERY_LOG_PATH", None)
+    return chroma_path
+
+
+@pytest.fixture
+def asked(monkeypatch):
+    """Answer questions without the RAG pipeline, recording them."""
+    questions = []
+
+    def query_rag_structured(question):
+        questions.append(question)
+        return {"answer": f"Answer to {question}", "sources": [], "retrieval": None}
+
+    monkeypatch.setattr(
+        query_data_enhanced, "query_rag_structured", query_rag_structured
+    )
+    return questions
+
+
+def make_answers(monkeypatch):
+    """PrecomputedAnswers that records refreshes instead of starting them."""
+    answers = PrecomputedAnswers()
+    answers.refreshes = 0
+
+    def refresh_in_background():
+        answers.refreshes += 1
+        answers.refreshing = True
+
+    monkeypatch.setattr(answers, "refresh_in_background", refresh_in_background)
+    return answers
+
+
+def write_store(index_version="v1", pipeline=None):
+    store = {
+        "index_version": index_version,
+        "pipeline": pipeline or query_data_enhanced.pipeline_fingerprint(),
+        "created": "2026-01-01T00:00:00",
+        "answers": {
+            "how do you win in monopoly": {
+                "question": "How do you win in Monopoly?",
+                "answer": "Be the last player left.",
+                "sources": [],
+            }
+        },
+    }
+    precomputed_answers.save_precomputed_answers(store)
+
+
+def test_normalize_question_ignores_case_spacing_and_final_punctuation():
+    assert normalize_question("  How do you WIN\tin Monopoly?! ") == (
+        "how do you win in monopoly"
+    )
+    assert normalize_question("Who goes first.") == normalize_question("who goes first")
+
+
+def test_mine_query_log_returns_frequent_questions_first(tmp_path):
+    log_path = tmp_path / "queries.jsonl"
+    lines = (
+        ["How do I get out of jail?"] * 2
+        + ["What is Free Parking?"] * 4
+        + ["how do i get out of jail"]
+        + ["Rare question"] * 2
+    )
+    log_path.write_text(
+        "\n".join(json.dumps({"question": line}) for line in lines)
+        + "\nnot json\n"
+        + json.dumps({"time": "no question"})
+        + "\n"
+    )
+
+    assert mine_query_log(str(log_path), min_count=3) == [
+        "What is Free Parking?",
+        "How do I get out of jail?",
+    ]
+    assert mine_query_log(str(log_path), min_count=3, limit=1) == [
+        "What is Free Parking?"
+    ]
+
+
+@pytest.mark.parametrize(
+    "setting, value",
+    [
+        ("LLM_BACKEND", "fake"),
+        ("LLM_MODEL", "mistral"),
+        ("EMBEDDING_MODEL", "other-embedding"),
+        ("PROMPT_TEMPLATE", "Answer: {question}"),
+        ("MAX_DISTANCE", float("inf")),
+        ("DEPTH_RATIO", 0.5),
+    ],
+)
+def test_pipeline_fingerprint_covers_the_answer_settings(monkeypatch, setting, value):
+    original = query_data_enhanced.pipeline_fingerprint()
+    monkeypatch.setattr(query_data_enhanced, setting, value)
+
+    assert query_data_enhanced.pipeline_fingerprint() != original
+
+
+def test_fresh_answers_are_served(index, monkeypatch):
+    write_store()
+    answers = make_answers(monkeypatch)
+
+    result = answers.lookup("how do you win in monopoly")
+
+    assert result["answer"] == "Be the last player left."
+    assert answers.fresh
+    assert answers.refreshes == 0
+
+
+@pytest.mark.parametrize(
+    "store", [{"index_version": "v0"}, {"pipeline": "other-llm-and-prompt"}]
+)
+def test_stale_answers_are_not_served_and_are_regenerated(index, monkeypatch, store):
+    write_store(**store)
+    answers = make_answers(monkeypatch)
+
+    assert answers.lookup("How do you win in Monopoly?") is None
+    assert answers.lookup("How do you win in Monopoly?") is None
+    assert answers.refreshes == 1
+
+
+def test_failed_refresh_is_retried_after_a_delay(index, monkeypatch):
+    def unreachable_llm(question):
+        raise ConnectionError("LLM unreachable")
+
+    monkeypatch.setattr(query_data_enhanced, "query_rag_structured", unreachable_llm)
+    answers = make_answers(monkeypatch)
+    answers.check_index()
+    answers.refresh()
+
+    answers.check_index()
+    assert answers.refreshes == 1
+    assert not answers.fresh
+
+    # The retry delay has passed.
+    answers.retry_at = time.monotonic() - 1
+    answers.check_index()
+    assert answers.refreshes == 2
+
+
+def test_refreshed_answers_are_served(index, monkeypatch, asked):
+    answers = make_answers(monkeypatch)
+    answers.check_index()
+    answers.refresh()
+
+    result = answers.lookup("How do you win in Monopoly")
+
+    assert result["answer"] == "Answer to How do you win in Monopoly?"
+    assert asked == ["How do you win in Monopoly?"]
+    assert answers.fresh
+
+
+def test_precompute_reuses_answers_only_for_the_same_pipeline(index, asked):
+    write_store(pipeline="other-llm-and-prompt")
+    precompute_answers(["How do you win in Monopoly?"])
+    assert asked == ["How do you win in Monopoly?"]
+
+    store = precompute_answers(["How do you win in Monopoly?"])
+    assert asked == ["How do you win in Monopoly?"]
+    assert store["pipeline"] == current_version()["pipeline"]
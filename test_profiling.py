@@ -0,0 +1,18 @@
+import pytest
+
+from profiling import parse_slow_query_ms
+
+
+def test_threshold_is_parsed_once():
+    assert parse_slow_query_ms("2000") == 2000.0
+    assert parse_slow_query_ms("0") == 0.0
+
+
+def test_unset_threshold_disables_the_log():
+    assert parse_slow_query_ms(None) is None
+
+
+@pytest.mark.parametrize("value", ["2s", "", "-1", "inf", "nan"])
+def test_invalid_threshold_disables_the_log_with_a_warning(value, caplog):
+    assert parse_slow_query_ms(value) is None
+    assert "RAG_SLOW_QUERY_MS" in caplog.text
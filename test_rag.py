@@ -1,4 +1,4 @@
-from query_data import query_rag
+import rag_client
 from langchain_community.llms.ollama import Ollama
 
 EVAL_PROMPT = """
@@ -24,7 +24,10 @@ def test_ticket_to_ride_rules():
 
 
 def query_and_validate(question: str, expected_response: str):
-    response_text = query_rag(question)
+    # Reuse a running API or daemon when there is one instead of reloading
+    # the whole RAG stack for every test.
+    result, _answered_by = rag_client.query(question)
+    response_text = result["answer"]
     prompt = EVAL_PROMPT.format(
         expected_response=expected_response, actual_response=response_text
     )
@@ -0,0 +1,145 @@
+import pytest
+from langchain.schema.document import Document
+
+import conversation
+import query_data_enhanced
+from conversation import ConversationSession
+from query_data_enhanced import (
+    NOT_ENOUGH_INFORMATION,
+    query_rag_structured,
+    select_chunks,
+)
+
+
+@pytest.fixture(autouse=True)
+def defaults(monkeypatch):
+    # Pin the thresholds, so RAG_* settings in the environment don't matter.
+    monkeypatch.setattr(query_data_enhanced, "MAX_CHUNKS", 5)
+    monkeypatch.setattr(query_data_enhanced, "MAX_DISTANCE", 1.2)
+    monkeypatch.setattr(query_data_enhanced, "DEPTH_RATIO", 0.25)
+
+
+class RecordingLLM:
+    """Records the prompts it is asked to complete."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        return "Be the last player left."
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    model = RecordingLLM()
+    monkeypatch.setattr(query_data_enhanced, "get_model", lambda: model)
+    monkeypatch.setattr(conversation, "get_model", lambda: model)
+    monkeypatch.setattr(query_data_enhanced, "embed_query", lambda text: [1.0, 0.0])
+    monkeypatch.setattr(conversation, "embed_query", lambda text: [1.0, 0.0])
+    return model
+
+
+def make_candidates(distances: list) -> list:
+    return [(f"chunk {n}", distance) for n, distance in enumerate(distances)]
+
+
+def search_returning(distances: list):
+    documents = [
+        (Document(page_content=f"Rule {n}", metadata={"id": f"rules.pdf:0:{n}"}), d)
+        for n, d in enumerate(distances)
+    ]
+    return lambda query_text, sources=None, games=None, embedding=None: documents
+
+
+def test_a_clear_best_match_is_used_on_its_own():
+    chosen, retrieval = select_chunks(make_candidates([0.3, 0.8, 0.9, 1.0]))
+
+    assert chosen == [("chunk 0", 0.3)]
+    assert retrieval == {
+        "candidates": 4,
+        "depth": 1,
+        "best_distance": 0.3,
+        "early_exit": False,
+    }
+
+
+def test_close_matches_are_kept_together():
+    chosen, retrieval = select_chunks(make_candidates([0.4, 0.45, 0.5, 0.9]))
+
+    assert [doc for doc, _distance in chosen] == ["chunk 0", "chunk 1", "chunk 2"]
+    assert retrieval["depth"] == 3
+
+
+def test_exits_early_when_nothing_is_relevant():
+    chosen, retrieval = select_chunks(make_candidates([1.3, 1.5, 1.9]))
+
+    assert chosen == []
+    assert retrieval == {
+        "candidates": 3,
+        "depth": 0,
+        "best_distance": 1.3,
+        "early_exit": True,
+    }
+
+
+def test_exits_early_without_candidates():
+    chosen, retrieval = select_chunks([])
+
+    assert chosen == []
+    assert retrieval["best_distance"] is None
+    assert retrieval["early_exit"] is True
+
+
+def test_depth_is_capped_at_max_chunks():
+    chosen, retrieval = select_chunks(
+        make_candidates([0.5 + n / 100 for n in range(8)])
+    )
+
+    assert len(chosen) == query_data_enhanced.MAX_CHUNKS
+    assert chosen == make_candidates([0.5 + n / 100 for n in range(8)])[:5]
+    assert retrieval["depth"] == 5
+    assert retrieval["candidates"] == 8
+
+
+def test_query_exits_early_without_calling_the_llm(monkeypatch, llm):
+    monkeypatch.setattr(
+        query_data_enhanced, "search_candidates", search_returning([1.4, 1.6])
+    )
+
+    result = query_rag_structured("What does the dragon card do?")
+
+    assert llm.prompts == []
+    assert result["answer"] == NOT_ENOUGH_INFORMATION
+    assert result["sources"] == []
+    assert result["retrieval"]["early_exit"] is True
+
+
+def test_query_sends_only_the_chosen_chunks_to_the_llm(monkeypatch, llm):
+    monkeypatch.setattr(
+        query_data_enhanced, "search_candidates", search_returning([0.3, 0.9])
+    )
+
+    result = query_rag_structured("How do you win in Monopoly?")
+
+    assert len(llm.prompts) == 1
+    assert "Rule 0" in llm.prompts[0] and "Rule 1" not in llm.prompts[0]
+    assert [source["id"] for source in result["sources"]] == ["rules.pdf:0:0"]
+    assert result["retrieval"]["depth"] == 1
+
+
+def test_conversation_reports_retrieval_and_exits_early(monkeypatch, llm):
+    monkeypatch.setattr(
+        query_data_enhanced, "search_candidates", search_returning([1.5])
+    )
+
+    result = ConversationSession().ask("What does the dragon card do?")
+
+    assert llm.prompts == []
+    assert result["answer"] == NOT_ENOUGH_INFORMATION
+    assert result["retrieval"] == {
+        "candidates": 1,
+        "depth": 0,
+        "best_distance": 1.5,
+        "early_exit": True,
+    }
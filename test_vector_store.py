@@ -0,0 +1,92 @@
+import pytest
+
+import vector_store
+from vector_store import UnknownSourceError, resolve_sources, similarity_search
+
+SOURCES = {
+    "data/monopoly.pdf": {"collection": "source_monopoly", "chunks": 3},
+    "data/ticket_to_ride.pdf": {"collection": "source_ticket_to_ride", "chunks": 2},
+}
+
+
+class FakeCollection:
+    """Returns fixed (document, distance) pairs and records the searches."""
+
+    def __init__(self, results):
+        self.results = results
+        self.searches = []
+
+    def similarity_search_by_vector_with_relevance_scores(self, embedding, k, **kwargs):
+        self.searches.append({"embedding": embedding, "k": k, **kwargs})
+        return self.results[:k]
+
+
+@pytest.fixture
+def indexed(monkeypatch):
+    monkeypatch.setattr(vector_store, "indexed_sources", lambda: SOURCES)
+
+
+@pytest.fixture
+def partitioned(monkeypatch):
+    collections = {
+        "source_monopoly": FakeCollection(
+            [("monopoly 0", 0.2), ("monopoly 1", 0.5), ("monopoly 2", 0.9)]
+        ),
+        "source_ticket_to_ride": FakeCollection([("ticket 0", 0.3), ("ticket 1", 0.4)]),
+    }
+    monkeypatch.setattr(
+        vector_store,
+        "load_manifest",
+        lambda: {"partitioned": True, "sources": SOURCES},
+    )
+    monkeypatch.setattr(vector_store, "get_collection", collections.__getitem__)
+    return collections
+
+
+def test_no_filter_resolves_to_none(indexed):
+    assert resolve_sources() is None
+    assert resolve_sources([], []) is None
+
+
+@pytest.mark.parametrize(
+    "requested",
+    ["data/monopoly.pdf", "monopoly.pdf", "monopoly", "Monopoly"],
+)
+def test_sources_resolve_by_path_file_name_slug_and_name(indexed, requested):
+    assert resolve_sources(sources=[requested]) == ["data/monopoly.pdf"]
+
+
+def test_games_resolve_by_display_name_and_slug(indexed):
+    assert resolve_sources(games=["Ticket to Ride", "ticket_to_ride"]) == [
+        "data/ticket_to_ride.pdf"
+    ]
+
+
+def test_sources_and_games_are_combined_without_duplicates(indexed):
+    resolved = resolve_sources(
+        sources=["monopoly.pdf"], games=["Ticket To Ride", "Monopoly"]
+    )
+
+    assert resolved == ["data/monopoly.pdf", "data/ticket_to_ride.pdf"]
+
+
+def test_unknown_game_lists_the_indexed_games(indexed):
+    with pytest.raises(UnknownSourceError, match="Monopoly, Ticket To Ride"):
+        resolve_sources(games=["Catan"])
+
+
+def test_partitioned_search_only_queries_the_requested_sources(partitioned):
+    results = similarity_search(
+        "How do I buy a house?", k=2, sources=["data/monopoly.pdf"], embedding=[0.1]
+    )
+
+    assert results == [("monopoly 0", 0.2), ("monopoly 1", 0.5)]
+    assert partitioned["source_monopoly"].searches == [{"embedding": [0.1], "k": 2}]
+    assert partitioned["source_ticket_to_ride"].searches == []
+
+
+def test_partitioned_search_merges_every_partition_by_distance(partitioned):
+    results = similarity_search("How do you win?", k=3, embedding=[0.1])
+
+    assert results == [("monopoly 0", 0.2), ("ticket 0", 0.3), ("ticket 1", 0.4)]
+    assert all(len(collection.searches) == 1 for collection in partitioned.values())
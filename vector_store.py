@@ -0,0 +1,184 @@
+"""
+Access to the Chroma collections that hold the indexed chunks.
+
+The index is stored either in a single collection, or with one collection per
+source PDF (populate_database.py --partition-by-source) so that a query
+restricted to some sources only searches their vectors. populate_database.py
+records the layout and the indexed sources in a manifest (index.json) inside
+the Chroma directory.
+"""
+
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from get_embedding_function import get_embedding_function
+
+CHROMA_PATH = "chroma"
+MANIFEST_PATH = os.path.join(CHROMA_PATH, "index.json")
+
+# langchain_chroma's default collection, used when the index isn't partitioned.
+DEFAULT_COLLECTION = "langchain"
+PARTITION_PREFIX = "source_"
+
+
+class UnknownSourceError(ValueError):
+    """A source or game filter doesn't match any indexed source."""
+
+
+def source_slug(source: str) -> str:
+    """Lowercase file name of a source, e.g. "ticket_to_ride"."""
+    name = os.path.splitext(os.path.basename(source))[0]
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+def game_name(source: str) -> str:
+    """Display name of the game in a source, e.g. "Ticket To Ride"."""
+    return source_slug(source).replace("_", " ").title()
+
+
+def partition_name(source: str) -> str:
+    # Chroma collection names are limited to 63 characters.
+    return f"{PARTITION_PREFIX}{source_slug(source)}"[:63]
+
+
+def load_manifest() -> Dict:
+    """Read the index manifest, or describe a single-collection index without one."""
+    if os.path.exists(MANIFEST_PATH):
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    return {"partitioned": False, "sources": {}}
+
+
+def save_manifest(manifest: Dict):
+    os.makedirs(CHROMA_PATH, exist_ok=True)
+    # Queries read the manifest while populate_database.py may be writing it,
+    # so replace it in one step rather than rewriting it in place.
+    temporary_path = f"{MANIFEST_PATH}.{os.getpid()}.tmp"
+    with open(temporary_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temporary_path, MANIFEST_PATH)
+
+
+@lru_cache(maxsize=None)
+def get_query_embedding_function():
+    return get_embedding_function()
+
+
+@lru_cache(maxsize=None)
+def get_collection(collection_name: str = DEFAULT_COLLECTION):
+    """Open a Chroma collection once per process and reuse it for every query."""
+    from langchain_chroma import Chroma
+
+    return Chroma(
+        collection_name=collection_name,
+        persist_directory=CHROMA_PATH,
+        embedding_function=get_query_embedding_function(),
+    )
+
+
+def indexed_sources() -> Dict[str, Dict]:
+    """
+    Return {source: info} for every indexed source.
+
+    Indexes built before the manifest existed are scanned for the sources
+    recorded in their chunk metadata.
+    """
+    manifest = load_manifest()
+    if manifest["sources"] or not os.path.exists(CHROMA_PATH):
+        return manifest["sources"]
+
+    sources = {}
+    items = get_collection().get(include=["metadatas"])
+    for metadata in items["metadatas"]:
+        source = metadata.get("source", "")
+        info = sources.setdefault(
+            source, {"collection": DEFAULT_COLLECTION, "chunks": 0}
+        )
+        info["chunks"] += 1
+    return sources
+
+
+def resolve_sources(
+    sources: Optional[List[str]] = None, games: Optional[List[str]] = None
+) -> Optional[List[str]]:
+    """
+    Turn source and game filters into a list of indexed source paths.
+
+    Sources may be given as their path ("data/monopoly.pdf") or file name;
+    games by name ("Ticket to Ride") or slug ("ticket_to_ride"). Returns None
+    when no filter was given, and raises UnknownSourceError for a filter that
+    matches no indexed source.
+    """
+    if not sources and not games:
+        return None
+
+    available = indexed_sources()
+    by_name = {}
+    for source in available:
+        by_name[source] = source
+        by_name[os.path.basename(source)] = source
+        by_name[source_slug(source)] = source
+
+    resolved = []
+    for requested in list(sources or []) + list(games or []):
+        key = requested if requested in by_name else source_slug(requested)
+        if key not in by_name:
+            raise UnknownSourceError(
+                f"Unknown source or game '{requested}'. "
+                f"Indexed games: {', '.join(game_name(s) for s in available)}"
+            )
+        if by_name[key] not in resolved:
+            resolved.append(by_name[key])
+    return resolved
+
+
+def embed_query(query_text: str) -> List[float]:
+    return get_query_embedding_function().embed_query(query_text)
+
+
+def similarity_search(
+    query_text: str,
+    k: int,
+    sources: Optional[List[str]] = None,
+    embedding: Optional[List[float]] = None,
+):
+    """
+    Return the k nearest (document, distance) pairs, optionally only from the
+    given sources.
+
+    In a partitioned index only the collections of the requested sources are
+    searched; otherwise the source filter is passed to Chroma with the query.
+    Pass embedding to reuse an already computed query embedding.
+    """
+    if embedding is None:
+        embedding = embed_query(query_text)
+    manifest = load_manifest()
+
+    if manifest["partitioned"]:
+        collection_names = [
+            manifest["sources"][source]["collection"]
+            for source in (sources or manifest["sources"])
+        ]
+        results = []
+        for collection_name in collection_names:
+            collection = get_collection(collection_name)
+            results.extend(
+                collection.similarity_search_by_vector_with_relevance_scores(
+                    embedding, k=k
+                )
+            )
+        results.sort(key=lambda result: result[1])
+        return results[:k]
+
+    if not sources:
+        search_filter = None
+    elif len(sources) == 1:
+        search_filter = {"source": sources[0]}
+    else:
+        search_filter = {"source": {"$in": sources}}
+    return get_collection().similarity_search_by_vector_with_relevance_scores(
+        embedding, k=k, filter=search_filter
+    )
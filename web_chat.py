@@ -2,7 +2,7 @@ import os
 
 import streamlit as st
 
-from query_data import query_rag
+from conversation import ConversationSession
 
 # Page config
 st.set_page_config(page_title="RAG Chat - Board Games", page_icon="🎲", layout="wide")
@@ -22,6 +22,11 @@ if not os.path.exists("chroma"):
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
+# The conversation session rewrites follow-up questions and keeps a rolling
+# summary, so each turn doesn't need the full history.
+if "conversation" not in st.session_state:
+    st.session_state.conversation = ConversationSession()
+
 # Display chat history
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
@@ -45,19 +50,9 @@ if prompt := st.chat_input("Ask a question about the board games..."):
         with st.spinner("Thinking..."):
             try:
                 # Get response from RAG system
-                response = query_rag(prompt)
-
-                # Parse response to extract sources
-                if "Sources:" in response:
-                    response_text, sources_text = response.split("Sources:", 1)
-                    sources = [
-                        s.strip()
-                        for s in sources_text.strip("[]").split(",")
-                        if s.strip()
-                    ]
-                else:
-                    response_text = response
-                    sources = []
+                result = st.session_state.conversation.ask(prompt)
+                response_text = result["answer"]
+                sources = [source["id"] for source in result["sources"]]
 
                 # Display response
                 st.markdown(response_text)
@@ -67,6 +62,11 @@ if prompt := st.chat_input("Ask a question about the board games..."):
                     with st.expander("📚 Sources"):
                         for source in sources:
                             st.text(f"• {source}")
+                        retrieval = result["retrieval"]
+                        st.caption(
+                            f"{retrieval['depth']} of {retrieval['candidates']} "
+                            "retrieved chunks used"
+                        )
 
                 # Add assistant message to chat history
                 st.session_state.messages.append(
@@ -100,7 +100,7 @@ with st.sidebar:
         st.success("✅ Database loaded")
         # Count documents (simple check)
         try:
-            from query_data import query_rag
+            from conversation import ConversationSession
 
             st.info("Database is ready for queries")
         except:
@@ -111,6 +111,7 @@ with st.sidebar:
     st.header("🚀 Quick Actions")
     if st.button("Clear Chat History"):
         st.session_state.messages = []
+        st.session_state.conversation = ConversationSession()
         st.rerun()
 
     if st.button("Rebuild Database"):